@@ -15,3 +15,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FittSync.settings')
 
 # Get the ASGI application
 application = get_asgi_application()
+
+# Build the in-memory search indexes before the worker takes traffic
+from FitedSync.search import warm_indexes
+
+warm_indexes()
@@ -40,6 +40,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'FitedSync.profiling.ProfilingMiddleware',
+    'FitedSync.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,6 +98,47 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The local-memory backend is per process: run several workers with the file
+# backend (DASHBOARD_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# and a shared DASHBOARD_CACHE_LOCATION directory) or a shared cache server so
+# invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': os.environ.get('DASHBOARD_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_LOCATION', 'fitsync-dashboard'),
+    },
+}
+DASHBOARD_CACHE_TIMEOUT = 300
+# Seconds a process may serve a cached catalog version stamp (catalog ETags)
+CATALOG_VERSION_TIMEOUT = 5
+
+# Delta sync (/api/sync/): re-read window for transactions still open when a
+# token was issued, and how long deletions are remembered before a client
+# holding an older token gets a full reset
+SYNC_OVERLAP_SECONDS = 30
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+# Upper bound on operations in one /api/batch/ request
+BATCH_MAX_OPERATIONS = 100
+
+# Offline food catalog snapshots (publish_food_snapshot, /api/foods/snapshot/)
+FOOD_SNAPSHOT_DIR = os.environ.get('FOOD_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+FOOD_SNAPSHOT_KEEP = 10
+
+# Memory-mapped per-gram nutrient matrix of the food catalog (FitedSync.nutrients)
+NUTRIENT_CACHE_DIR = os.environ.get('NUTRIENT_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+# Longest date range /api/nutrition-report/ accepts
+NUTRITION_REPORT_MAX_DAYS = 366
+
+# Meal plan solver (FitedSync.mealplan): parallel restarts, pool size and time budget in seconds
+MEAL_PLAN_RESTARTS = 4
+MEAL_PLAN_WORKERS = 4
+MEAL_PLAN_TIMEOUT = 0.2
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -146,4 +189,41 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+    'DEFAULT_RENDERER_CLASSES': [
+        'FitedSync.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Keyset pagination for the log and meal listings
+LOG_PAGE_SIZE = 50
+LOG_MAX_PAGE_SIZE = 500
+
+# Page size of filtered and sorted food catalog queries (FitedSync.foodquery)
+FOOD_PAGE_SIZE = 50
+FOOD_MAX_PAGE_SIZE = 500
+
+# Per-request SQL/latency profiling, off unless REQUEST_PROFILING=True.
+# Requests over either budget are logged as warnings.
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'False') == 'True'
+PROFILING_QUERY_BUDGET = int(os.environ.get('PROFILING_QUERY_BUDGET', 30))
+PROFILING_LATENCY_BUDGET_MS = int(os.environ.get('PROFILING_LATENCY_BUDGET_MS', 500))
+
+# /metrics aggregation across worker processes. Point this at a directory
+# shared by the workers of one host and empty it when the server starts.
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR') or None
+METRICS_FLUSH_INTERVAL = 1  # seconds
+# Addresses or networks (comma separated) the Prometheus scraper may fetch
+# /metrics from without logging in; staff users can always see it.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'FitedSync.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
@@ -15,3 +15,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FitSync.settings')
 
 # Get the WSGI application
 application = get_wsgi_application()
+
+# Build the in-memory search indexes before the worker takes traffic
+from FitedSync.search import warm_indexes
+
+warm_indexes()
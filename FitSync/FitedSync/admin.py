@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, WorkoutLog, MealLog, Goal, CalorieBalance
+from .models import CustomUser, WorkoutLog, MealLog, Goal, CalorieBalance, FoodItem, Exercise, WorkoutRoutine
 
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('username', 'weight', 'height', 'daily_calorie_goal')
@@ -47,3 +47,27 @@ class CalorieBalanceAdmin(admin.ModelAdmin):
     ordering = ('-date',)
 
 admin.site.register(CalorieBalance, CalorieBalanceAdmin)
+
+# Catalog admins; edits here bump the catalog version stamps (see FitedSync.signals)
+class FoodItemAdmin(admin.ModelAdmin):
+    list_display = ('food_name', 'caloric_value', 'protein', 'carbohydrates', 'fat', 'updated_at')
+    search_fields = ('food_name',)
+    ordering = ('food_name',)
+
+admin.site.register(FoodItem, FoodItemAdmin)
+
+class ExerciseAdmin(admin.ModelAdmin):
+    list_display = ('title', 'muscle_group', 'equipment', 'updated_at')
+    search_fields = ('title',)
+    list_filter = ('muscle_group', 'equipment')
+    ordering = ('title',)
+
+admin.site.register(Exercise, ExerciseAdmin)
+
+class WorkoutRoutineAdmin(admin.ModelAdmin):
+    list_display = ('routine_id', 'name', 'workout_type', 'difficulty_level', 'duration', 'updated_at')
+    search_fields = ('name', 'routine_id')
+    list_filter = ('workout_type', 'difficulty_level')
+    ordering = ('routine_id',)
+
+admin.site.register(WorkoutRoutine, WorkoutRoutineAdmin)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FitedsyncConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'FitedSync'
+
+    def ready(self):
+        # Keep the in-memory indexes in sync with model changes
+        from . import signals  # noqa: F401
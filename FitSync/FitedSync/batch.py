@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from rest_framework import status
+
+from .calories import estimate_exercise_logs
+from .models import CustWorkoutLog, ExerciseLog, Meal, MealLog, WorkoutLog
+from .serializers import CustWorkoutLogSerializer, ExerciseLogSerializer, MealSerializer, WorkoutLogSerializer
+from .services import MealIngestError, bulk_create_with_ids, ingest_meal
+from .signals import batched_log_updates, log_rows_changed
+
+# resource -> (model, serializer); the same names as the /api/ routes
+LOG_RESOURCES = {
+    'exercise-logs': (ExerciseLog, ExerciseLogSerializer),
+    'workout-logs': (WorkoutLog, WorkoutLogSerializer),
+    'cust-workout-logs': (CustWorkoutLog, CustWorkoutLogSerializer),
+}
+MEALS = 'meals'
+METHODS = ('create', 'update', 'delete')
+
+
+class BatchError(Exception):
+    """An operation failed; the whole batch is rolled back."""
+
+    def __init__(self, index, status_code, errors):
+        super().__init__(errors)
+        self.index = index
+        self.status_code = status_code
+        self.errors = errors
+
+    def as_data(self):
+        return {'index': self.index, 'status': self.status_code, 'errors': self.errors}
+
+
+def _check(index, operation):
+    if not isinstance(operation, dict):
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, 'Each operation must be an object.')
+    method, resource = operation.get('method'), operation.get('resource')
+    if method not in METHODS:
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, f'method must be one of {", ".join(METHODS)}.')
+    if resource not in LOG_RESOURCES and resource != MEALS:
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, f'Unknown resource {resource!r}.')
+    if resource == MEALS and method == 'update':
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, 'Meals are replaced with create.')
+    if method != 'create' and operation.get('id') is None:
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, 'id is required.')
+    if method != 'delete' and not isinstance(operation.get('data'), dict):
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, 'data must be an object.')
+    return method, resource
+
+
+def _groups(operations):
+    """Split the operations into runs; consecutive log creates on one resource share a run."""
+    run = []
+    for index, operation in enumerate(operations):
+        method, resource = _check(index, operation)
+        bulk = method == 'create' and resource in LOG_RESOURCES
+        if run and not (bulk and run[-1][1:3] == (method, resource)):
+            yield run
+            run = []
+        run.append((index, method, resource, operation))
+        if not bulk:
+            yield run
+            run = []
+    if run:
+        yield run
+
+
+def _get_row(request, index, model, operation):
+    row = model.objects.filter(user=request.user, pk=operation['id']).first()
+    if row is None:
+        raise BatchError(index, status.HTTP_404_NOT_FOUND, 'Not found.')
+    return row
+
+
+def _create_logs(request, run):
+    """Validate every create in the run and insert them with one bulk_create."""
+    model, serializer_class = LOG_RESOURCES[run[0][2]]
+    serializers = []
+    for index, _, _, operation in run:
+        serializer = serializer_class(data=operation['data'], context={'request': request})
+        if not serializer.is_valid():
+            raise BatchError(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+        serializers.append(serializer)
+
+    rows = [serializer.build(serializer.validated_data) for serializer in serializers]
+    if model is ExerciseLog:
+        # Missing calories for the whole run in one batch
+        estimate_exercise_logs(rows, request.user.weight)
+    bulk_create_with_ids(model, rows, request.user)
+    # bulk_create skips the model signals, so record the change here
+    log_rows_changed(model, request.user.pk, {row.date for row in rows})
+    return [{'status': status.HTTP_201_CREATED, 'data': serializer_class(row).data} for row in rows]
+
+
+def _update_log(request, index, resource, operation):
+    model, serializer_class = LOG_RESOURCES[resource]
+    row = _get_row(request, index, model, operation)
+    serializer = serializer_class(row, data=operation['data'], partial=True, context={'request': request})
+    if not serializer.is_valid():
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+    serializer.save()
+    return {'status': status.HTTP_200_OK, 'data': serializer.data}
+
+
+def _create_meal(request, index, operation):
+    data = operation['data']
+    date, meal_type, food_items = data.get('date'), data.get('meal_type'), data.get('food_items')
+    if not date or not meal_type or not food_items:
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, 'date, meal_type, and food_items are required.')
+    try:
+        meal, totals = ingest_meal(request.user, date, meal_type, food_items)
+    except MealIngestError as e:
+        raise BatchError(index, status.HTTP_400_BAD_REQUEST, str(e))
+    prefetch_related_objects([meal], Prefetch('meal_logs', queryset=MealLog.objects.select_related('food_item')))
+    return {'status': status.HTTP_201_CREATED, 'data': {**MealSerializer(meal).data, 'totals': totals}}
+
+
+def run_batch(request, operations):
+    """
+    Apply operations in order inside one transaction and return one result
+    per operation. Any failure raises BatchError and rolls everything back.
+
+    Each operation is {"method": "create" | "update" | "delete", "resource":
+    one of LOG_RESOURCES or "meals", "id": ... (update/delete), "data": {...}
+    (create/update)}. Meal creates go through ingest_meal, so they replace
+    any meal already logged for the same date and meal_type. Rollups and the
+    dashboard cache are refreshed once per (user, date) at the end.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError(None, status.HTTP_400_BAD_REQUEST, 'operations must be a non-empty list.')
+    limit = getattr(settings, 'BATCH_MAX_OPERATIONS', 100)
+    if len(operations) > limit:
+        raise BatchError(None, status.HTTP_400_BAD_REQUEST, f'At most {limit} operations per batch.')
+
+    results = []
+    with transaction.atomic(), batched_log_updates():
+        for run in _groups(operations):
+            index, method, resource, operation = run[0]
+            if method == 'create' and resource in LOG_RESOURCES:
+                results.extend(_create_logs(request, run))
+            elif method == 'create':
+                results.append(_create_meal(request, index, operation))
+            elif method == 'update':
+                results.append(_update_log(request, index, resource, operation))
+            else:
+                model = Meal if resource == MEALS else LOG_RESOURCES[resource][0]
+                _get_row(request, index, model, operation).delete()
+                results.append({'status': status.HTTP_204_NO_CONTENT})
+    return results
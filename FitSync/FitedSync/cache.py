@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import uuid
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+
+class DashboardCache:
+    """
+    Per-user, per-date cache for the dashboard endpoints.
+
+    Every cached entry embeds a version token for its user and for each date
+    it covers. Invalidating a (user, date) just replaces that date's token,
+    so every entry touching the date misses from then on without having to
+    track or delete keys. Profile changes replace the user-wide token.
+    """
+    # Entries spanning more days than this are computed without caching
+    max_days = 62
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+    @staticmethod
+    def _user_key(user_id):
+        return f'dash:v:{user_id}'
+
+    @staticmethod
+    def _day_key(user_id, day):
+        return f'dash:v:{user_id}:{day.isoformat()}'
+
+    def _versions(self, keys):
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # A fresh random token can never match an entry cached earlier
+                self.cache.add(key, uuid.uuid4().hex, None)
+                versions[key] = self.cache.get(key)
+        return [versions[key] for key in keys]
+
+    @staticmethod
+    def date_range(start, end):
+        """Every date from start to end inclusive, or None if the range is unusable."""
+        try:
+            start = start if isinstance(start, date) else date.fromisoformat(start)
+            end = end if isinstance(end, date) else date.fromisoformat(end)
+        except (TypeError, ValueError):
+            return None
+        if end < start or (end - start).days >= DashboardCache.max_days:
+            return None
+        return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+    def get_or_compute(self, name, user_id, dates, compute, params=''):
+        """
+        Return the cached value for this endpoint, user, dates and params,
+        calling compute() on a miss. dates=None skips the cache entirely.
+        """
+        if dates is None:
+            return compute()
+
+        keys = [self._user_key(user_id)] + [self._day_key(user_id, day) for day in dates]
+        versions = self._versions(keys)
+        digest = hashlib.blake2b(':'.join(map(str, versions)).encode(), digest_size=16).hexdigest()
+        key = f'dash:{name}:{user_id}:{params}:{digest}'
+
+        value = self.cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            value = compute()
+            if isinstance(value, ReturnList):
+                value = list(value)
+            elif isinstance(value, ReturnDict):
+                value = dict(value)
+            self.cache.set(key, value, self.timeout)
+        return value
+
+    def invalidate_day(self, user_id, day):
+        self.cache.set(self._day_key(user_id, day), uuid.uuid4().hex, None)
+
+    def invalidate_user(self, user_id):
+        self.cache.set(self._user_key(user_id), uuid.uuid4().hex, None)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else None,
+        }
+
+
+dashboard_cache = DashboardCache('dashboard')
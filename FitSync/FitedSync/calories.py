@@ -0,0 +1,99 @@
+import numpy as np
+from django.conf import settings
+
+# kcal = MET * 3.5 ml O2/kg/min * body weight (kg) / 200 * minutes
+KCAL_FACTOR = 3.5 / 200
+
+# Compendium of Physical Activities values for each routine type
+WORKOUT_TYPE_METS = {
+    'Strength Training': 5.0,
+    'HIIT': 8.0,
+    'Yoga': 2.5,
+    'Dance': 5.0,
+    'Cardio': 7.0,
+    'Core Training': 3.8,
+    'Circuit Training': 8.0,
+    'Plyometrics': 7.7,
+}
+
+# Resistance exercises by equipment (lowercased); bodyweight work is calisthenics
+EQUIPMENT_METS = {
+    'body only': 3.8,
+    'dumbbell': 5.0,
+    'dumbbells': 5.0,
+    'barbell': 6.0,
+    'e-z curl bar': 5.0,
+    'kettlebells': 6.0,
+    'cable': 5.0,
+    'cables': 5.0,
+    'machine': 5.0,
+    'weight bench': 5.0,
+    'exercise ball': 3.5,
+    'medicine ball': 4.5,
+    'bands': 3.5,
+}
+DEFAULT_MET = 4.0
+
+# Scales the MET for how hard the session is meant to be
+DIFFICULTY_FACTORS = {
+    'Beginner': 0.85,
+    'Intermediate': 1.0,
+    'Advanced': 1.15,
+}
+
+
+def default_weight():
+    return getattr(settings, 'CALORIE_DEFAULT_WEIGHT_KG', 70)
+
+
+def burn(mets, weights, minutes):
+    """
+    Calories burned for each (MET, body weight in kg, minutes), rounded to
+    0.1 kcal. Any argument can be a single value shared by every row.
+    Missing weights fall back to CALORIE_DEFAULT_WEIGHT_KG.
+    """
+    size = max((len(value) for value in (mets, weights, minutes) if isinstance(value, (list, tuple))), default=None)
+    if size is None:
+        return round(float(mets) * KCAL_FACTOR * float(weights or default_weight()) * float(minutes), 1)
+
+    if isinstance(weights, (list, tuple)):
+        weights = [weight or default_weight() for weight in weights]
+    else:
+        weights = weights or default_weight()
+    result = np.asarray(mets, dtype=float) * KCAL_FACTOR * np.asarray(weights, dtype=float) * np.asarray(minutes, dtype=float)
+    return np.broadcast_to(result.round(1), (size,)).tolist()
+
+
+def routine_met(workout_type, difficulty_level):
+    return WORKOUT_TYPE_METS.get(workout_type, DEFAULT_MET) * DIFFICULTY_FACTORS.get(difficulty_level, 1.0)
+
+
+def exercise_met(exercise):
+    return EQUIPMENT_METS.get((exercise.equipment or '').strip().lower(), DEFAULT_MET)
+
+
+def custom_workout_met(workout):
+    """
+    MET of a custom workout: its exercises' METs weighted by sets * reps,
+    scaled by the difficulty. Reads workout_exercises (and their exercise)
+    through the prefetch cache when available.
+    """
+    total = volume = 0.0
+    for workout_exercise in workout.workout_exercises.all():
+        sets_reps = workout_exercise.sets * workout_exercise.repetitions
+        total += exercise_met(workout_exercise.exercise) * sets_reps
+        volume += sets_reps
+    met = total / volume if volume else DEFAULT_MET
+    return met * DIFFICULTY_FACTORS.get(workout.difficulty_level, 1.0)
+
+
+def estimate_exercise_logs(logs, user_weight):
+    """Fill in calories_burned, in one batch, for ExerciseLogs the client sent without it."""
+    missing = [log for log in logs if log.calories_burned is None]
+    if not missing:
+        return
+    calories = burn(
+        [exercise_met(log.exercise) for log in missing], user_weight, [log.duration_minutes for log in missing]
+    )
+    for log, value in zip(missing, calories):
+        log.calories_burned = round(value)
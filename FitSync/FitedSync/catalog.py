@@ -0,0 +1,86 @@
+import calendar
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import CatalogVersion
+
+FOODS = 'foods'
+EXERCISES = 'exercises'
+ROUTINES = 'routines'
+
+
+class CatalogVersions:
+    """
+    Version stamps for the catalogs, read through the cache.
+
+    Reads hit the database only when the cached stamp has expired, so a
+    conditional GET can be answered without querying the catalog. The TTL
+    bounds how long a process with its own cache can serve an old stamp.
+    """
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CATALOG_VERSION_TIMEOUT', 5)
+
+    @staticmethod
+    def _key(name):
+        return f'catalog-version:{name}'
+
+    def get(self, name, fresh=False):
+        """(version, updated_at) of the catalog; fresh skips the cached stamp."""
+        stamp = None if fresh else cache.get(self._key(name))
+        if stamp is None:
+            row, _ = CatalogVersion.objects.get_or_create(name=name)
+            stamp = (row.version, row.updated_at)
+            cache.set(self._key(name), stamp, self.timeout)
+        return stamp
+
+    def bump(self, *names):
+        for name in names:
+            updated = CatalogVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=timezone.now())
+            if not updated:
+                CatalogVersion.objects.get_or_create(name=name)
+            # Drop the cached stamp once the new one is visible to other connections
+            transaction.on_commit(lambda name=name: cache.delete(self._key(name)))
+
+
+catalog_versions = CatalogVersions()
+
+
+def conditional_catalog_response(request, name, respond, *parts):
+    """
+    Answer a GET for catalog name with strong ETag / Last-Modified validation.
+
+    The ETag covers the catalog version, the full path, the negotiated media
+    type and any extra parts the response depends on (e.g. the user's
+    weight). A matching If-None-Match or If-Modified-Since gets a 304 before
+    respond() is called; otherwise respond() builds the response. Responses
+    with extra parts get no Last-Modified, since it can't reflect them.
+    """
+    version, updated_at = catalog_versions.get(name)
+    digest = hashlib.blake2b(
+        repr((request.get_full_path(), request.accepted_media_type, parts)).encode(), digest_size=8
+    ).hexdigest()
+    etag = quote_etag(f'{name}-{version}-{digest}')
+    # Last-Modified only tracks the catalog, so it can't vouch for responses
+    # that also depend on the extra parts; those validate by ETag alone
+    last_modified = None if parts else calendar.timegm(updated_at.utctimetuple())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = respond()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Private: the catalogs require authentication
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
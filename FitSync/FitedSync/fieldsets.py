@@ -0,0 +1,160 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+COMPACT_PARAM = 'compact'
+
+
+def _names(request, param):
+    names = []
+    for value in request.query_params.getlist(param):
+        names.extend(part.strip() for part in value.split(',') if part.strip())
+    return names
+
+
+def has_fieldset(request):
+    return FIELDS_PARAM in request.query_params or EXCLUDE_PARAM in request.query_params
+
+
+def is_compact(request):
+    return request.query_params.get(COMPACT_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def wants_sparse(request):
+    """Whether the response needs the sparse path rather than e.g. cached full rows."""
+    return request.method == 'GET' and (has_fieldset(request) or is_compact(request))
+
+
+def to_columns(columns, rows):
+    """The compact shape: column names once and every row as a list."""
+    return {'columns': columns, 'rows': [[row[column] for column in columns] for row in rows]}
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin: on the actions a view lists in sparse_actions,
+    ?fields=a,b keeps only those fields and ?exclude=c drops some.
+    Unknown names are a 400.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request, view = self.context.get('request'), self.context.get('view')
+        if request is None or request.method != 'GET' or not has_fieldset(request):
+            return
+        if getattr(view, 'action', None) not in getattr(view, 'sparse_actions', ()):
+            return
+
+        fields, exclude = _names(request, FIELDS_PARAM), _names(request, EXCLUDE_PARAM)
+        unknown = (set(fields) | set(exclude)) - set(self.fields)
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unknown field(s): {', '.join(sorted(unknown))}."})
+        for name in list(self.fields):
+            if (fields and name not in fields) or name in exclude:
+                self.fields.pop(name)
+
+
+def _column(field, model):
+    """The model column behind a serializer field, or None if it isn't a plain column."""
+    if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+        return None
+    if '.' in field.source or field.source == '*':
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete:
+        return None
+    if model_field.is_relation and not isinstance(field, serializers.PrimaryKeyRelatedField):
+        return None
+    return model_field.name
+
+
+def narrow_queryset(queryset, serializer, required=()):
+    """Load only the columns the serializer's remaining fields (and required) read."""
+    # Skip prefetches for nested fields that were left out
+    sources = {field.source.split('.')[0] for field in serializer.fields.values()}
+    lookups = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if getattr(lookup, 'prefetch_through', lookup).split('__')[0] in sources
+    ]
+    queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+    select_related = queryset.query.select_related
+    if select_related is True:
+        return queryset
+    columns = {queryset.model._meta.pk.name, *(select_related or ()), *required}
+    for field in serializer.fields.values():
+        column = _column(field, queryset.model)
+        if column is None:
+            # Computed or nested fields may read anything
+            return queryset
+        columns.add(column)
+    return queryset.only(*columns)
+
+
+def plain_rows(queryset, serializer):
+    """
+    Rows as dicts read with values_list(), skipping model instances, when
+    every field maps to a column; None otherwise.
+    """
+    fields = serializer.fields
+    columns = [_column(field, queryset.model) for field in fields.values()]
+    if None in columns:
+        return None
+
+    converters = [
+        None if isinstance(field, serializers.PrimaryKeyRelatedField) else field.to_representation
+        for field in fields.values()
+    ]
+    names = list(fields)
+    rows = []
+    for values in queryset.prefetch_related(None).values_list(*columns):
+        rows.append({
+            name: value if value is None or convert is None else convert(value)
+            for name, convert, value in zip(names, converters, values)
+        })
+    return rows
+
+
+class SparseFieldsetViewMixin:
+    """
+    ?fields= / ?exclude= narrow the serializer and the query on list,
+    retrieve and history, and ?compact=1 returns lists column-wise.
+    """
+    sparse_actions = ('list', 'retrieve', 'history')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method == 'GET' and has_fieldset(self.request) and self.action in self.sparse_actions:
+            required = getattr(self.paginator, 'required_columns', ())
+            queryset = narrow_queryset(queryset, self.get_serializer(), required)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not wants_sparse(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        serializer = self.get_serializer()
+        rows = plain_rows(queryset, serializer)
+        if rows is None:
+            rows = self.get_serializer(queryset, many=True).data
+        return self.sparse_response(rows, serializer)
+
+    def sparse_response(self, rows, serializer=None):
+        if is_compact(self.request):
+            rows = to_columns(list((serializer or self.get_serializer()).fields), rows)
+        return Response(rows)
+
+    def get_paginated_response(self, data):
+        if is_compact(self.request):
+            data = to_columns(list(self.get_serializer().fields), data)
+        return super().get_paginated_response(data)
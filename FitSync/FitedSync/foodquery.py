@@ -0,0 +1,109 @@
+from django.core.exceptions import FieldError, ValidationError as DjangoValidationError
+from django.db.models import Case, IntegerField, When
+from rest_framework.exceptions import ValidationError
+
+from .models import FoodItem
+from .nutrients import MEAL_LOG_FIELDS, food_table
+
+ORDERING_PARAM = 'ordering'
+PAGING_PARAMS = ('limit', 'offset')
+# FoodItem's own columns; relations are left out, so filters never join
+FILTER_FIELDS = tuple(field.name for field in FoodItem._meta.concrete_fields if not field.is_relation)
+MEMORY_LOOKUPS = ('exact', 'gt', 'gte', 'lt', 'lte', 'isnull')
+# What the database may be asked instead; no regexes or arbitrary joins
+DATABASE_LOOKUPS = MEMORY_LOOKUPS + ('iexact', 'contains', 'icontains', 'startswith', 'istartswith', 'in')
+SORT_COLUMNS = ('id', 'food_name') + food_table.COLUMNS
+
+
+def _column(name):
+    # calories/carbohydrates etc. as on MealLog, besides the FoodItem names
+    return MEAL_LOG_FIELDS.get(name, name)
+
+
+def _filter(param):
+    """(column, lookup) when param filters on a FoodItem column, else None."""
+    name, _, lookup = param.partition('__')
+    column = _column(name)
+    if column not in FILTER_FIELDS:
+        return None
+    return column, lookup or 'exact'
+
+
+def has_food_query(request):
+    """
+    Whether a catalog list asks for filtering, sorting or paging. Other
+    parameters (fieldsets, format, cache busters) don't count.
+    """
+    return any(
+        param == ORDERING_PARAM or param in PAGING_PARAMS or _filter(param)
+        for param in request.query_params
+    )
+
+
+def parse_food_query(query_params):
+    """
+    (in-memory filters, database filters, ordering) from a catalog query
+    string. Comparisons on nutrient columns, e.g. ?protein__gte=20&
+    calories__lte=200, become (column, lookup, value) filters for the food
+    table; other lookups on FoodItem columns (?food_name__icontains=cheese)
+    are left for the database. Parameters that name no FoodItem column are
+    ignored; unusable lookups and values are a 400.
+    """
+    memory, database = [], {}
+    for param, value in query_params.items():
+        match = _filter(param)
+        if match is None:
+            continue
+        column, lookup = match
+        if column in food_table.COLUMNS and lookup in MEMORY_LOOKUPS:
+            if lookup == 'isnull':
+                memory.append((column, lookup, value.lower() in ('1', 'true', 'yes')))
+                continue
+            try:
+                memory.append((column, lookup, float(value)))
+            except ValueError:
+                raise ValidationError({param: "Expected a number."})
+            continue
+        if lookup not in DATABASE_LOOKUPS:
+            raise ValidationError({param: f"Unsupported lookup {lookup}."})
+        database[f'{column}__{lookup}'] = value.split(',') if lookup == 'in' else value
+
+    if database:
+        try:
+            # Builds (but doesn't run) the query, which checks every field, lookup and value
+            FoodItem.objects.filter(**database)
+        except (FieldError, DjangoValidationError, TypeError, ValueError):
+            raise ValidationError({'filters': f"Unknown or invalid filter(s): {', '.join(sorted(database))}."})
+
+    ordering = []
+    for name in query_params.get(ORDERING_PARAM, '').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        descending = name.startswith('-')
+        column = _column(name.lstrip('-'))
+        if column not in SORT_COLUMNS:
+            raise ValidationError({ORDERING_PARAM: f"Can't sort by {name.lstrip('-')}."})
+        ordering.append('-' + column if descending else column)
+    return memory, database, ordering
+
+
+def query_food_ids(query_params):
+    """
+    Ids of the foods matching a catalog query, in order. Only the filters
+    the food table can't answer cost a query, which returns just the ids.
+    """
+    memory, database, ordering = parse_food_query(query_params)
+    ids = None
+    if database:
+        ids = list(FoodItem.objects.filter(**database).values_list('pk', flat=True))
+    return food_table.query(memory, ordering, ids).tolist()
+
+
+def in_order(queryset, ids):
+    """queryset limited to ids, in the order of ids."""
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(
+        Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    )
@@ -0,0 +1,115 @@
+import threading
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .calories import burn
+from .models import WorkoutExercise, WorkoutRoutine
+from .renderers import RawJSON, encode_json
+from .serializers import ExerciseSerializer, FoodItemSerializer, WorkoutRoutineSerializer
+
+
+class FragmentCache:
+    """
+    Encoded JSON for every catalog row, cached per process and keyed by the
+    row's updated_at.
+
+    A list is served by reading (id, updated_at) for the queryset, encoding
+    only the rows whose version changed since they were cached, and joining
+    the cached bytes, so unchanged rows are never serialized again. Changes
+    that don't touch a row's own columns must bump its updated_at, which is
+    what keeps workers in other processes from serving stale bytes.
+    """
+
+    def __init__(self, serializer_class, prefetch=()):
+        self.serializer_class = serializer_class
+        self.prefetch = prefetch
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def extra(self, instance):
+        """Anything besides the bytes to keep for the row; see RoutineFragmentCache."""
+        return None
+
+    def entries(self, queryset):
+        """(pk, bytes, extra) for every row of queryset, in queryset order."""
+        versions = list(queryset.values_list('pk', 'updated_at'))
+        entries = self._entries
+        stale = [pk for pk, version in versions if entries.get(pk, (None,))[0] != version]
+        if stale:
+            instances = list(queryset.model._default_manager.filter(pk__in=stale).prefetch_related(*self.prefetch))
+            # One list serializer for the whole batch instead of a serializer per row
+            rows = self.serializer_class(instances, many=True).data
+            fresh = {
+                instance.pk: (instance.updated_at, encode_json(row), self.extra(instance))
+                for instance, row in zip(instances, rows)
+            }
+            with self._lock:
+                self._entries = entries = {**self._entries, **fresh}
+        # Rows deleted since the versions were read are simply left out
+        return [(pk, entries[pk][1], entries[pk][2]) for pk, _ in versions if pk in entries]
+
+    def render_list(self, queryset):
+        return RawJSON(b'[' + b','.join(fragment for _, fragment, _ in self.entries(queryset)) + b']')
+
+    def render_one(self, queryset, pk):
+        entries = self.entries(queryset.filter(pk=pk))
+        return RawJSON(entries[0][1]) if entries else None
+
+    def discard(self, pk):
+        with self._lock:
+            self._entries = {key: value for key, value in self._entries.items() if key != pk}
+
+
+class _RoutineFragmentSerializer(WorkoutRoutineSerializer):
+    # calories_burned depends on the user's weight, so it is added per request
+    class Meta(WorkoutRoutineSerializer.Meta):
+        fields = [field for field in WorkoutRoutineSerializer.Meta.fields if field != 'calories_burned']
+
+
+class RoutineFragmentCache(FragmentCache):
+    """Routine fragments without calories_burned; the MET is kept to compute it per user."""
+
+    def extra(self, instance):
+        return (instance.met, instance.duration)
+
+    def _with_calories(self, entries, user_weight, duration):
+        # Every routine's calories in one batch
+        calories = burn(
+            [met for _, _, (met, _) in entries],
+            user_weight,
+            [duration if duration is not None else routine_duration for _, _, (_, routine_duration) in entries],
+        )
+        return [
+            fragment[:-1] + b',"calories_burned":' + encode_json(value) + b'}'
+            for (_, fragment, _), value in zip(entries, calories)
+        ]
+
+    def render_list(self, queryset, user_weight=None, duration=None):
+        return RawJSON(b'[' + b','.join(self._with_calories(self.entries(queryset), user_weight, duration)) + b']')
+
+    def render_one(self, queryset, pk, user_weight=None, duration=None):
+        entries = self.entries(queryset.filter(pk=pk))
+        if not entries:
+            return None
+        return RawJSON(self._with_calories(entries, user_weight, duration)[0])
+
+
+def touch_routines(routine_ids=None, exercise_ids=None):
+    """Bump updated_at on routines whose nested exercises changed, so their fragments are rebuilt."""
+    routines = WorkoutRoutine.objects.all()
+    if routine_ids is not None:
+        routines = routines.filter(pk__in=routine_ids)
+    if exercise_ids is not None:
+        routines = routines.filter(pk__in=WorkoutExercise.objects.filter(
+            exercise_id__in=exercise_ids
+        ).values('workout_id'))
+    routines.update(updated_at=timezone.now())
+
+
+food_fragments = FragmentCache(FoodItemSerializer)
+exercise_fragments = FragmentCache(ExerciseSerializer)
+routine_fragments = RoutineFragmentCache(_RoutineFragmentSerializer, prefetch=[
+    Prefetch('workoutexercise_set', queryset=WorkoutExercise.objects.select_related('exercise')),
+    'exercise',
+])
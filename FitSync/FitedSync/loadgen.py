@@ -0,0 +1,254 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import (
+    CustomUser, CustWorkout, CustWorkoutExercise, CustWorkoutLog, Exercise, ExerciseLog,
+    FitnessGoal, FoodItem, Meal, MealLog, UserDailyLog, WorkoutLog, WorkoutRoutine,
+)
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snacks']
+CUSTOM_ROUTINE_NAMES = ['Morning Run', 'Leg Day', 'Push Pull', 'Evening Walk', 'Mobility', 'Bike Commute']
+BATCH_SIZE = 5000
+
+# activity level -> (share of users, TDEE multiplier)
+ACTIVITY_LEVELS = {
+    'sedentary': (0.3, 1.2),
+    'lightly_active': (0.3, 1.375),
+    'moderately_active': (0.25, 1.55),
+    'very_active': (0.1, 1.725),
+    'extra_active': (0.05, 1.9),
+}
+# fitness goal -> (target weight change in kg, daily calorie adjustment)
+GOALS = {
+    'LOSE_WEIGHT': ((-15, -3), -500),
+    'MAINTAIN_WEIGHT': ((0, 0), 0),
+    'GAIN_WEIGHT': ((3, 10), 300),
+    'GAIN_MUSCLE': ((2, 8), 250),
+    'MODIFY_DIET': ((-3, 0), 0),
+}
+
+
+def user_rng(seed, index, stream='profile'):
+    """An RNG for one synthetic user, so the data doesn't depend on how the work is split up."""
+    return random.Random(f'{seed}:{index}:{stream}')
+
+
+def random_profile(rng, today=None):
+    """Plausible body measurements, activity level, goal and daily calorie goal."""
+    today = today or date.today()
+    gender = rng.choices(['M', 'F', 'O'], weights=[48, 48, 4])[0]
+    height = rng.gauss(177 if gender == 'M' else 164 if gender == 'F' else 170, 7)
+    weight = max(40.0, rng.gauss(26, 4) * (height / 100) ** 2)
+    age = rng.randint(18, 70)
+    levels = list(ACTIVITY_LEVELS)
+    activity_level = rng.choices(levels, weights=[ACTIVITY_LEVELS[level][0] for level in levels])[0]
+    goal = rng.choice(list(GOALS))
+    (low, high), adjustment = GOALS[goal]
+
+    # Mifflin-St Jeor
+    bmr = 10 * weight + 6.25 * height - 5 * age + (5 if gender == 'M' else -161)
+    return {
+        'gender': gender,
+        'height': round(height, 1),
+        'weight': round(weight, 1),
+        'date_of_birth': today - timedelta(days=age * 365 + rng.randrange(365)),
+        'target_weight': round(weight + rng.uniform(low, high), 1),
+        'activity_level': activity_level,
+        'daily_calorie_goal': max(1200, round(bmr * ACTIVITY_LEVELS[activity_level][1] + adjustment)),
+        'goal': goal,
+    }
+
+
+class Catalog:
+    """The catalog rows synthetic logs are drawn from, loaded once per process."""
+
+    def __init__(self):
+        self.foods = list(FoodItem.objects.values_list('id', 'food_name', 'caloric_value', 'protein', 'carbohydrates', 'fat'))
+        self.exercise_ids = list(Exercise.objects.values_list('id', flat=True))
+        self.routines = list(WorkoutRoutine.objects.values_list('name', 'duration'))
+        if not self.foods or not self.exercise_ids:
+            raise ValueError('The food and exercise catalogs are empty, run import_data first.')
+
+
+def create_users(prefix, count, seed=0):
+    """
+    Create users named {prefix}-{n} with random profiles; users that already
+    exist are kept. Returns them in order.
+    """
+    emails = [f'{prefix}-{n}@example.com' for n in range(count)]
+    existing = set(CustomUser.objects.filter(email__in=emails).values_list('email', flat=True))
+    # Hashing is deliberately slow, so every synthetic user shares one password hash
+    password = make_password('loadtest')
+
+    users, goals = [], {}
+    for index, email in enumerate(emails):
+        if email in existing:
+            continue
+        profile = random_profile(user_rng(seed, index))
+        goals[email] = profile.pop('goal')
+        users.append(CustomUser(username=email.split('@')[0], email=email, password=password, **profile))
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        if goals:
+            goal_ids = {name: FitnessGoal.objects.get_or_create(name=name)[0].id for name in GOALS}
+            user_ids = dict(CustomUser.objects.filter(email__in=goals).values_list('email', 'id'))
+            Through = CustomUser.fitness_goals.through
+            Through.objects.bulk_create([
+                Through(customuser_id=user_ids[email], fitnessgoal_id=goal_ids[goal])
+                for email, goal in goals.items()
+            ], batch_size=BATCH_SIZE)
+
+    users = CustomUser.objects.in_bulk(emails, field_name='email')
+    return [users[email] for email in emails]
+
+
+def create_custom_workouts(users, rng, catalog):
+    """Give every user one to three custom workouts; returns {user_id: [workout names]}."""
+    workouts = [
+        CustWorkout(
+            user_id=user.id, name=name, duration=rng.randint(15, 90),
+            difficulty_level=rng.choice(['Beginner', 'Intermediate', 'Advanced', 'All Levels']),
+        )
+        for user in users
+        for name in rng.sample(CUSTOM_ROUTINE_NAMES, rng.randint(1, 3))
+    ]
+    CustWorkout.objects.bulk_create(workouts, batch_size=BATCH_SIZE)
+
+    names = {}
+    exercises = []
+    for workout_id, user_id, name in CustWorkout.objects.filter(
+        user_id__in=[user.id for user in users], workout_exercises__isnull=True
+    ).values_list('id', 'user_id', 'name'):
+        names.setdefault(user_id, []).append(name)
+        for exercise_id in rng.sample(catalog.exercise_ids, min(len(catalog.exercise_ids), rng.randint(2, 5))):
+            exercises.append(CustWorkoutExercise(
+                workout_id=workout_id, exercise_id=exercise_id,
+                sets=rng.randint(2, 5), repetitions=rng.randint(6, 15),
+            ))
+    CustWorkoutExercise.objects.bulk_create(exercises, batch_size=BATCH_SIZE)
+    return names
+
+
+def build_history(user, days, rng, catalog, end=None, custom_routines=None):
+    """
+    Build one user's synthetic log rows for the days ending at end (today by
+    default). Returns {model: [unsaved rows]}; nothing touches the database.
+    """
+    end = end or date.today()
+    custom_routines = custom_routines or CUSTOM_ROUTINE_NAMES
+    weight = user.weight or 70
+    rows = {MealLog: [], ExerciseLog: [], WorkoutLog: [], CustWorkoutLog: [], UserDailyLog: []}
+
+    for offset in range(days):
+        day = end - timedelta(days=days - 1 - offset)
+        consumed = burned = 0
+
+        for meal_type in MEAL_TYPES:
+            if meal_type == 'snacks' and rng.random() < 0.5:
+                continue
+            for _ in range(rng.randint(1, 3)):
+                food_id, food_name, calories, protein, carbohydrates, fat = rng.choice(catalog.foods)
+                factor = rng.choice([50, 100, 150, 200, 250]) / 100
+                rows[MealLog].append(MealLog(
+                    user_id=user.id, date=day, meal_type=meal_type, food_item_id=food_id,
+                    quantity=factor * 100, food_name=food_name, calories=calories * factor,
+                    protein=protein * factor, carbohydrates=carbohydrates * factor, fat=fat * factor,
+                ))
+                consumed += calories * factor
+
+        for _ in range(rng.randint(0, 3)):
+            minutes = rng.randint(10, 60)
+            calories = int(minutes * rng.uniform(4, 12))
+            rows[ExerciseLog].append(ExerciseLog(
+                user_id=user.id, exercise_id=rng.choice(catalog.exercise_ids), date=day,
+                duration_minutes=minutes, calories_burned=calories,
+                sets=rng.randint(2, 5), reps=rng.randint(6, 15),
+            ))
+            burned += calories
+
+        if catalog.routines and rng.random() < 0.4:
+            name, minutes = rng.choice(catalog.routines)
+            calories = minutes * weight * rng.uniform(0.08, 0.15)
+            rows[WorkoutLog].append(WorkoutLog(
+                user_id=user.id, date=day, routine_name=name,
+                duration_minutes=minutes, calories_burned=calories,
+            ))
+            burned += calories
+
+        if rng.random() < 0.25:
+            minutes = rng.randint(15, 90)
+            calories = minutes * rng.uniform(5, 10)
+            rows[CustWorkoutLog].append(CustWorkoutLog(
+                user_id=user.id, date=day, routine_name=rng.choice(custom_routines),
+                duration_minutes=minutes, calories_burned=calories,
+            ))
+            burned += calories
+
+        rows[UserDailyLog].append(UserDailyLog(
+            user_id=user.id, date=day, weight=round(weight + rng.uniform(-1, 1), 1),
+            total_calories_consumed=consumed, total_calories_burned=burned,
+        ))
+
+    return rows
+
+
+def link_meals(user_ids):
+    """Create the Meal rows (and their M2M links) for meal logs that are not in a meal yet."""
+    unlinked = MealLog.objects.filter(user_id__in=user_ids, meals__isnull=True).values_list(
+        'id', 'user_id', 'date', 'meal_type'
+    )
+    slots = {}
+    for meal_log_id, user_id, day, meal_type in unlinked.iterator(chunk_size=BATCH_SIZE):
+        slots.setdefault((user_id, day, meal_type), []).append(meal_log_id)
+    if not slots:
+        return
+
+    # Read the meal ids back instead of relying on bulk_create returning them (MySQL doesn't)
+    existing = {
+        (user_id, day, meal_type)
+        for user_id, day, meal_type in Meal.objects.filter(user_id__in=user_ids).values_list('user_id', 'date', 'meal_type')
+    }
+    Meal.objects.bulk_create([
+        Meal(user_id=user_id, date=day, meal_type=meal_type)
+        for user_id, day, meal_type in slots if (user_id, day, meal_type) not in existing
+    ], batch_size=BATCH_SIZE)
+
+    meal_ids = {
+        (user_id, day, meal_type): meal_id
+        for meal_id, user_id, day, meal_type in
+        Meal.objects.filter(user_id__in=user_ids).values_list('id', 'user_id', 'date', 'meal_type')
+    }
+    Through = Meal.meal_logs.through
+    Through.objects.bulk_create([
+        Through(meal_id=meal_ids[slot], meallog_id=meal_log_id)
+        for slot, meal_log_ids in slots.items() for meal_log_id in meal_log_ids
+    ], batch_size=BATCH_SIZE)
+
+
+def seed_history(users, days, seed=0, catalog=None, end=None):
+    """
+    Bulk insert custom workouts and days of synthetic logs for every user.
+    users is a list of (index, user) pairs; the index picks the user's RNG.
+    Signals are skipped, so callers should rebuild the calorie rollups
+    afterwards. Returns the number of rows inserted per model name.
+    """
+    catalog = catalog or Catalog()
+    counts = {}
+    with transaction.atomic():
+        custom_routines = {}
+        for index, user in users:
+            custom_routines.update(create_custom_workouts([user], user_rng(seed, index, 'workouts'), catalog))
+
+        for index, user in users:
+            rows = build_history(
+                user, days, user_rng(seed, index, 'history'), catalog, end, custom_routines.get(user.id)
+            )
+            for model, model_rows in rows.items():
+                model.objects.bulk_create(model_rows, batch_size=BATCH_SIZE)
+                counts[model.__name__] = counts.get(model.__name__, 0) + len(model_rows)
+        link_meals([user.id for _, user in users])
+    return counts
@@ -0,0 +1,30 @@
+"""
+Process pool entry points for generate_load_data.
+
+Spawned workers unpickle these before Django is set up, so this module must
+not import models at import time; FitedSync.loadgen is imported lazily.
+"""
+
+_catalog = None
+
+
+def init_worker():
+    """Set Django up in the worker and drop any connections inherited from the parent."""
+    import django
+    from django.db import connections
+
+    django.setup()
+    connections.close_all()
+
+
+def seed_worker(task):
+    """Seed one chunk of users; task is ({user index: user id}, days, seed, end date)."""
+    from .loadgen import Catalog, seed_history
+    from .models import CustomUser
+
+    global _catalog
+    indexed_ids, days, seed, end = task
+    if _catalog is None:
+        _catalog = Catalog()
+    users = CustomUser.objects.in_bulk(indexed_ids.values())
+    return seed_history([(index, users[user_id]) for index, user_id in indexed_ids.items()], days, seed, _catalog, end)
@@ -0,0 +1,122 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from FitedSync.loadgen import create_users, seed_history
+from FitedSync.models import CustWorkoutLog, ExerciseLog, Meal, MealLog, UserDailyLog, WorkoutLog
+from FitedSync.rollups import rebuild_daily_rollups
+
+# Models whose Meta.indexes are dropped for the "without indexes" run
+INDEXED_MODELS = [MealLog, Meal, ExerciseLog, WorkoutLog, CustWorkoutLog, UserDailyLog]
+
+# name -> (URL name, whether the endpoint takes start_date/end_date or a single date)
+ENDPOINTS = {
+    'calorie-data': ('calorie-data-list', 'range'),
+    'daily-logs': ('daily-log-list', None),
+    'meals': ('meal-list', None),
+    'meals/summary': ('meal-get-daily-meal-summary', 'date'),
+    'exercise-logs': ('exercise-log-list', 'range'),
+    'exercise-logs/history': ('exercise-log-history', 'range'),
+    'workout-logs': ('workout-log-list', 'range'),
+    'workout-logs/history': ('workout-log-history', 'range'),
+    'cust-workout-logs': ('cust-workout-log-list', 'range'),
+    'cust-workout-logs/history': ('cust-workout-log-history', 'range'),
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic log history and report p50/p99 latency of the log endpoints with and without their indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Number of benchmark users.')
+        parser.add_argument('--days', type=int, default=365, help='Days of history per benchmark user.')
+        parser.add_argument('--iterations', type=int, default=200, help='Requests per endpoint per run.')
+        parser.add_argument('--window', type=int, default=30, help='Days covered by each date-range request.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data and the request mix.')
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse the benchmark users already in the database.')
+        parser.add_argument('--no-compare', action='store_true', help='Only measure with the indexes in place.')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        users = create_users('bench', options['users'], options['seed'])
+        if not options['skip_seed']:
+            fresh = [user for user in users if not UserDailyLog.objects.filter(user=user).exists()]
+            if fresh:
+                try:
+                    counts = seed_history([(users.index(user), user) for user in fresh], days, options['seed'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+                rebuild_daily_rollups([user.id for user in fresh])
+                self.stdout.write('Seeded ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
+
+        results = {'with indexes': self.run(users, days, options)}
+        if not options['no_compare']:
+            self.drop_indexes()
+            try:
+                results['without indexes'] = self.run(users, days, options)
+            finally:
+                self.restore_indexes()
+        self.report(results)
+
+    def run(self, users, days, options):
+        """Time every endpoint over the same request mix; returns {endpoint: [seconds]}."""
+        rng = random.Random(options['seed'])
+        client = APIClient(HTTP_HOST='localhost')
+        dashboard = caches['dashboard']
+        timings = {}
+        today = date.today()
+
+        for name, (url_name, params) in ENDPOINTS.items():
+            url = reverse(url_name)
+            samples = timings[name] = []
+            for _ in range(options['iterations']):
+                client.force_authenticate(rng.choice(users))
+                end = today - timedelta(days=rng.randrange(max(1, days - options['window'])))
+                query = {}
+                if params == 'range':
+                    query = {'start_date': (end - timedelta(days=options['window'] - 1)).isoformat(), 'end_date': end.isoformat()}
+                elif params == 'date':
+                    query = {'date': end.isoformat()}
+
+                # Measure the database, not the dashboard cache
+                dashboard.clear()
+                started = time.perf_counter()
+                response = client.get(url, query)
+                samples.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f'{name} returned {response.status_code}: {response.content[:200]!r}')
+        return timings
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+
+    def restore_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+
+    def report(self, results):
+        runs = list(results)
+        header = f"{'endpoint':<28}" + ''.join(f'{run + " p50":>22}{run + " p99":>22}' for run in runs)
+        self.stdout.write(header)
+        for name in ENDPOINTS:
+            line = f'{name:<28}'
+            for run in runs:
+                samples = results[run][name]
+                line += f'{percentile(samples, 50) * 1000:>20.2f}ms{percentile(samples, 99) * 1000:>20.2f}ms'
+            self.stdout.write(line)
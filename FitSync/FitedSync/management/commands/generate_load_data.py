@@ -0,0 +1,75 @@
+import multiprocessing
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from FitedSync.loadgen import Catalog, create_users
+from FitedSync.loadgen_workers import init_worker, seed_worker
+from FitedSync.models import UserDailyLog
+from FitedSync.rollups import rebuild_daily_rollups
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic users with days of meal, exercise and workout logs for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Number of users to generate.')
+        parser.add_argument('--days', type=int, default=365, help='Days of history per user, ending today.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed always produces the same data.')
+        parser.add_argument('--prefix', default='loadtest', help='Users are named <prefix>-<n>@example.com.')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes.')
+        parser.add_argument('--chunk-users', type=int, default=10, help='Users per transaction in a worker.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            Catalog()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        users = create_users(options['prefix'], options['users'], options['seed'])
+        # Users that already have a history are left alone, so the command can be rerun to top up
+        seeded = set(UserDailyLog.objects.filter(user__in=users).values_list('user_id', flat=True).distinct())
+        pending = [(index, user.id) for index, user in enumerate(users) if user.id not in seeded]
+        if not pending:
+            self.stdout.write('Every user already has a history, nothing to do.')
+            return
+
+        size = options['chunk_users']
+        tasks = [
+            (dict(pending[start:start + size]), options['days'], options['seed'], date.today())
+            for start in range(0, len(pending), size)
+        ]
+        workers = max(1, min(options['workers'], len(tasks)))
+        if connection.vendor == 'sqlite':
+            # SQLite allows a single writer at a time
+            workers = 1
+
+        counts = {}
+        if workers == 1:
+            results = map(seed_worker, tasks)
+            self.collect(results, counts, len(tasks))
+        else:
+            # Children must open their own connections rather than share the parent's sockets
+            connections.close_all()
+            with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+                self.collect(pool.imap_unordered(seed_worker, tasks), counts, len(tasks))
+
+        rollups = rebuild_daily_rollups([user_id for _, user_id in pending])
+
+        seconds = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} rows for {len(pending)} users with {workers} workers in {seconds:.1f}s '
+            f'({total / seconds:.0f} rows/s): '
+            + ', '.join(f'{count} {name}' for name, count in counts.items())
+            + f', {rollups} daily calorie rollups.'
+        ))
+
+    def collect(self, results, counts, task_count):
+        for done, chunk_counts in enumerate(results, 1):
+            for name, count in chunk_counts.items():
+                counts[name] = counts.get(name, 0) + count
+            self.stdout.write(f'{done}/{task_count} user chunks done', ending='\r')
+        self.stdout.write('')
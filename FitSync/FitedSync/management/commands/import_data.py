@@ -1,100 +1,211 @@
 import csv
+import hashlib
+import os
+import time
+from itertools import islice
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from FitedSync.catalog import EXERCISES, FOODS, ROUTINES, catalog_versions
+from FitedSync.fragments import touch_routines
 from FitedSync.models import Exercise, FoodItem, WorkoutRoutine
+from FitedSync.search import exercise_index, food_index, food_resolver
 from django.conf import settings
-import os
+
+
+def _float(value, nullable=False):
+    value = (value or '').strip()
+    if not value:
+        return None if nullable else 0.0
+    return float(value)
+
+
+def exercise_fields(row):
+    return {
+        'title': row['Title'],
+        'description': row['Description_URL'],
+        'image_url': row['Exercise_Image'],
+        'image_url_secondary': row['Exercise_Image1'],
+        'muscle_gp_details': row['muscle_gp_details'],
+        'equipment_details': row['equipment_details'],
+        'equipment': row['equipment'],
+        'muscle_group': row['muscle_group'],
+    }
+
+
+def food_fields(row):
+    return {
+        'food_name': row['food'],
+        'caloric_value': _float(row['Caloric Value']),
+        'fat': _float(row['Fat']),
+        'saturated_fats': _float(row['Saturated Fats']),
+        'monounsaturated_fats': _float(row['Monounsaturated Fats']),
+        'polyunsaturated_fats': _float(row['Polyunsaturated Fats']),
+        'carbohydrates': _float(row['Carbohydrates']),
+        'sugars': _float(row['Sugars']),
+        'protein': _float(row['Protein']),
+        'cholesterol': _float(row['Cholesterol']),
+        'sodium': _float(row['Sodium']),
+        'water': _float(row['Water']),
+        'vitamin_a': _float(row['Vitamin A'], nullable=True),
+        'vitamin_b1': _float(row['Vitamin B1'], nullable=True),
+        'vitamin_b2': _float(row['Vitamin B2'], nullable=True),
+        'vitamin_c': _float(row['Vitamin C'], nullable=True),
+        'vitamin_d': _float(row['Vitamin D'], nullable=True),
+        'vitamin_e': _float(row['Vitamin E'], nullable=True),
+        'vitamin_k': _float(row['Vitamin K'], nullable=True),
+        'calcium': _float(row['Calcium'], nullable=True),
+        'iron': _float(row['Iron'], nullable=True),
+        'nutrition_density': _float(row['Nutrition Density'], nullable=True),
+    }
+
+
+def routine_fields(row):
+    return {
+        'routine_id': row['Routine ID'],
+        'name': row['Name'],
+        'description': row['Description'],
+        'duration': int(row['Duration(minutes)']),
+        'difficulty_level': row['Difficulty Level'],
+        'workout_type': row['Type'],
+        'equipment_needed': row['Equipment Needed'],
+        'sets': int(row['Sets']),
+        'repetitions': row['Repetitions'],
+        'exercises': row['Exercises'],
+        'target_muscle_groups': row['Target Muscle Groups'],
+        'notes': row['Notes'],
+    }
+
+
+# name -> (CSV file, model, natural key, row parser)
+DATASETS = {
+    'exercises': ('combined_exercise_data.csv', Exercise, 'title', exercise_fields),
+    'foods': ('combined_food_data.csv', FoodItem, 'food_name', food_fields),
+    'routines': ('workout_routines.csv', WorkoutRoutine, 'routine_id', routine_fields),
+}
+
+
+def content_hash(values):
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).digest()
+
 
 class Command(BaseCommand):
     help = 'Populate database tables from CSV files.'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only', choices=DATASETS, action='append', dest='datasets',
+            help='Only import this dataset (can be repeated). Defaults to all of them.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='CSV rows read per chunk.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk INSERT/UPDATE.')
+
+    def handle(self, *args, **options):
         try:
-            # Import Exercises
-            # self.import_exercise_data()
-            # self.stdout.write(self.style.SUCCESS('Successfully imported exercises data.'))
-            
-            # # Import Food Items
-            # self.import_food_data()
-            # self.stdout.write(self.style.SUCCESS('Successfully imported food items data.'))
-            
-            # Import Workout Routines
-            self.import_workout_routines()
-            self.stdout.write(self.style.SUCCESS('Successfully imported workout routines data.'))
-        
+            for name in options['datasets'] or DATASETS:
+                stats = self.import_dataset(name, options['chunk_size'], options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Imported {name}: {stats['inserted']} inserted, {stats['updated']} updated, "
+                    f"{stats['unchanged']} unchanged, {stats['duplicates']} duplicate rows skipped "
+                    f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s)."
+                ))
         except Exception as e:
             raise CommandError(f'Error importing data: {e}')
 
-    # def import_exercise_data(self):
-    #     # Assuming 'combined_exercise_data.csv' is located in the base directory
-    #     path = os.path.join(settings.BASE_DIR, 'FitedSync', 'combined_exercise_data.csv')
-    #     with open(path, 'r') as file:
-    #         reader = csv.DictReader(file)
-    #         for row in reader:
-    #             Exercise.objects.update_or_create(
-    #                 title=row['Title'],
-    #                 defaults={
-    #                     'description': row['Description_URL'],
-    #                     'image_url': row['Exercise_Image'],
-    #                     'image_url_secondary': row['Exercise_Image1'],
-    #                     'muscle_gp_details': row['muscle_gp_details'],
-    #                     'equipment_details': row['equipment_details'],
-    #                     'equipment': row['equipment'],
-    #                     'muscle_group': row['muscle_group'],
-    #                 }
-    #             )
-
-    # def import_food_data(self):
-    #     # Assuming 'combined_food_data.csv' is located in the base directory
-    #     path = os.path.join(settings.BASE_DIR,'FitedSync', 'combined_food_data.csv')
-    #     with open(path, 'r') as file:
-    #         reader = csv.DictReader(file)
-    #         for row in reader:
-    #             FoodItem.objects.update_or_create(
-    #                 food = row['food'],
-    #                 defaults={
-    #                     'caloric_value': float(row['Caloric Value']),
-    #                     'fat': float(row['Fat']),
-    #                     'saturated_fats': float(row['Saturated Fats']),
-    #                     'monounsaturated_fats': float(row['Monounsaturated Fats']),
-    #                     'polyunsaturated_fats': float(row['Polyunsaturated Fats']),
-    #                     'carbohydrates': float(row['Carbohydrates']),
-    #                     'sugars': float(row['Sugars']),
-    #                     'protein': float(row['Protein']),
-    #                     'cholesterol': float(row['Cholesterol']),
-    #                     'sodium': float(row['Sodium']),
-    #                     'water': float(row['Water']),
-    #                     'vitamin_a': float(row['Vitamin A']),
-    #                     'vitamin_b1': float(row['Vitamin B1']),
-    #                     'vitamin_b2': float(row['Vitamin B2']),
-    #                     'vitamin_c': float(row['Vitamin C']),
-    #                     'vitamin_d': float(row['Vitamin D']),
-    #                     'vitamin_e': float(row['Vitamin E']),
-    #                     'vitamin_k': float(row['Vitamin K']),
-    #                     'calcium': float(row['Calcium']),
-    #                     'iron': float(row['Iron']),
-    #                     'nutrition_density': float(row['Nutrition Density']),
-    #                 }
-    #             )
-
-    def import_workout_routines(self):
-        # Assuming 'workout_routines.csv' is located in the base directory
-        path = os.path.join(settings.BASE_DIR,'FitedSync', 'workout_routines.csv')
-        with open(path, 'r') as file:
+    def import_dataset(self, name, chunk_size, batch_size):
+        """
+        Stream one CSV file and apply only the differences to its table.
+
+        Existing rows are loaded once and compared by natural key and content
+        hash; new rows are bulk inserted and changed rows bulk updated, so an
+        unchanged file costs a single SELECT.
+        """
+        filename, model, key_field, parse = DATASETS[name]
+        path = os.path.join(settings.BASE_DIR, 'FitedSync', filename)
+        started = time.perf_counter()
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0}
+
+        with open(path, 'r', newline='') as file:
             reader = csv.DictReader(file)
-            for row in reader:
-                WorkoutRoutine.objects.update_or_create(
-                    routine_id=row['Routine ID'],
-                    defaults={
-                        'name': row['Name'],
-                        'description': row['Description'],
-                        'duration': int(row['Duration(minutes)']),
-                        'difficulty_level': row['Difficulty Level'],
-                        'workout_type': row['Type'],
-                        'equipment_needed': row['Equipment Needed'],
-                        'sets': int(row['Sets']),
-                        'repetitions': row['Repetitions'],
-                        'exercises': row['Exercises'],
-                        'target_muscle_groups': row['Target Muscle Groups'],
-                        'notes': row['Notes'],
-                    }
-                )
+            fields = list(parse(dict.fromkeys(reader.fieldnames, '0')))
+            value_fields = [field for field in fields if field != key_field]
+            # A unique natural key lets the database merge inserts and updates
+            upsert = model._meta.get_field(key_field).unique
+
+            # natural key -> (pk, content hash); the first row wins if keys repeat
+            existing = {}
+            for pk, key, *values in model.objects.values_list('pk', key_field, *value_fields).order_by('pk'):
+                existing.setdefault(key, (pk, content_hash(values)))
+
+            seen = set()
+            with transaction.atomic():
+                while True:
+                    chunk = list(islice(reader, chunk_size))
+                    if not chunk:
+                        break
+
+                    to_create, to_update = [], []
+                    for row in chunk:
+                        data = parse(row)
+                        key = data[key_field]
+                        if key in seen:
+                            stats['duplicates'] += 1
+                            continue
+                        seen.add(key)
+
+                        digest = content_hash([data[field] for field in value_fields])
+                        if key not in existing:
+                            to_create.append(model(**data))
+                        elif existing[key][1] != digest:
+                            # bulk updates skip auto_now, and updated_at is the row's cache version
+                            data['updated_at'] = timezone.now()
+                            to_update.append(model(**data) if upsert else model(pk=existing[key][0], **data))
+                        else:
+                            stats['unchanged'] += 1
+
+                    if upsert:
+                        self.upsert_rows(model, key_field, value_fields, to_create + to_update, batch_size)
+                    else:
+                        self.apply_changes(model, value_fields, to_create, to_update, batch_size)
+                    stats['inserted'] += len(to_create)
+                    stats['updated'] += len(to_update)
+
+        if stats['inserted'] or stats['updated']:
+            self.catalog_changed(model)
+
+        stats['seconds'] = time.perf_counter() - started
+        total = stats['inserted'] + stats['updated'] + stats['unchanged'] + stats['duplicates']
+        stats['rows_per_second'] = total / stats['seconds'] if stats['seconds'] else 0
+        return stats
+
+    def upsert_rows(self, model, key_field, value_fields, rows, batch_size):
+        if rows:
+            model.objects.bulk_create(
+                rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=[key_field],
+                update_fields=value_fields + ['updated_at'],
+            )
+
+    def apply_changes(self, model, value_fields, to_create, to_update, batch_size):
+        if to_create:
+            model.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            model.objects.bulk_update(to_update, value_fields + ['updated_at'], batch_size=batch_size)
+
+    def catalog_changed(self, model):
+        # Bulk writes skip the model signals, so rebuild the in-memory indexes
+        # and bump the version stamps behind the catalog ETags
+        if model is FoodItem:
+            food_index.invalidate()
+            food_resolver.invalidate()
+            catalog_versions.bump(FOODS)
+        elif model is Exercise:
+            exercise_index.invalidate()
+            # Routines embed their exercises, so their cached JSON is stale too
+            touch_routines()
+            catalog_versions.bump(EXERCISES, ROUTINES)
+        elif model is WorkoutRoutine:
+            catalog_versions.bump(ROUTINES)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from FitedSync.snapshots import snapshot_store
+
+
+class Command(BaseCommand):
+    help = 'Publish an offline snapshot of the food catalog (and a diff from the previous one) if it changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Check the rows even if the catalog version has not changed.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            entry = snapshot_store.publish(force=options['force'])
+        except Exception as e:
+            raise CommandError(f'Error publishing food snapshot: {e}')
+        if entry is None:
+            self.stdout.write('Food catalog unchanged; no snapshot written.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Published food snapshot v{entry['version']} ({entry['rows']} rows, {entry['size']} bytes)"
+            + (f", diff {entry['diff_size']} bytes." if entry['diff'] else '.')
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from FitedSync.rollups import rebuild_daily_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily calorie rollup table from the meal, exercise and workout logs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only rebuild rollups for this user id (can be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            count = rebuild_daily_rollups(options['user_ids'])
+        except Exception as e:
+            raise CommandError(f'Error rebuilding calorie rollups: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily calorie rollup rows.'))
@@ -0,0 +1,277 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from .models import FoodItem, MealLog
+from .nutrients import COLUMN, MEAL_LOG_FIELDS, nutrient_matrix
+
+MEAL_TYPES = [choice for choice, _ in MealLog._meta.get_field('meal_type').choices]
+# meal type -> (default share of the day's calories, default number of foods)
+MEAL_DEFAULTS = {'breakfast': (0.25, 3), 'lunch': (0.35, 3), 'dinner': (0.3, 3), 'snacks': (0.1, 1)}
+MAX_ITEMS = 6
+
+# Share of calories from protein, carbohydrates and fat for each fitness
+# goal; a user with several goals gets the first one listed here
+MACRO_SPLITS = {
+    'GAIN_MUSCLE': (0.3, 0.45, 0.25),
+    'LOSE_WEIGHT': (0.3, 0.4, 0.3),
+    'GAIN_WEIGHT': (0.2, 0.5, 0.3),
+    'MODIFY_DIET': (0.2, 0.5, 0.3),
+    'MAINTAIN_WEIGHT': (0.2, 0.5, 0.3),
+}
+DEFAULT_SPLIT = (0.2, 0.5, 0.3)
+KCAL_PER_GRAM = np.array([4.0, 4.0, 9.0])
+
+# Solver columns are the MealLog fields: calories, protein, carbohydrates, fat.
+# Calories count most, then protein.
+FIELDS = list(MEAL_LOG_FIELDS)
+WEIGHTS = np.array([4.0, 2.0, 1.0, 1.0])
+MIN_GRAMS, MAX_GRAMS, GRAM_STEP = 20, 400, 5
+SWAP_PASSES = 4
+REFIT_SWEEPS = 10
+
+
+class MealPlanError(ValueError):
+    """Raised for unusable meal plan options; the message is safe to show to clients."""
+
+
+def _scale(target):
+    # Relative squared error, so grams of fat and kcal weigh the same
+    return WEIGHTS / np.maximum(target, 1.0) ** 2
+
+
+def _error(total, target, scale):
+    return float((scale * (target - total) ** 2).sum())
+
+
+def _best_additions(foods, residual, scale):
+    """For every food, the grams that best close residual and the error left after adding them."""
+    weighted = foods * scale
+    grams = np.clip((weighted @ residual) / np.maximum((weighted * foods).sum(axis=1), 1e-12), MIN_GRAMS, MAX_GRAMS)
+    left = residual - grams[:, None] * foods
+    return grams, (left * left * scale).sum(axis=1)
+
+
+def _refit(rows, grams, target, scale):
+    """Bounded least squares on the grams of the chosen foods, by coordinate descent."""
+    grams = grams.copy()
+    for _ in range(REFIT_SWEEPS):
+        for slot in range(len(grams)):
+            residual = target - grams @ rows + grams[slot] * rows[slot]
+            weighted = rows[slot] * scale
+            denominator = weighted @ rows[slot]
+            if denominator > 0:
+                grams[slot] = min(max((weighted @ residual) / denominator, MIN_GRAMS), MAX_GRAMS)
+    return grams
+
+
+def solve_meal(foods, allowed, target, count):
+    """
+    Pick count foods and their grams so their nutrients come closest to
+    target: a greedy fill followed by swap passes, each step scoring every
+    allowed food at once. Returns (row indexes, grams).
+    """
+    scale = _scale(target)
+    chosen, grams, total = [], [], np.zeros(len(target))
+    for _ in range(count):
+        amounts, errors = _best_additions(foods, target - total, scale)
+        errors[~allowed] = np.inf
+        errors[chosen] = np.inf
+        row = int(np.argmin(errors))
+        if not np.isfinite(errors[row]):
+            break
+        chosen.append(row)
+        grams.append(amounts[row])
+        total = total + amounts[row] * foods[row]
+    if not chosen:
+        return [], np.zeros(0)
+
+    grams = np.array(grams)
+    for _ in range(SWAP_PASSES):
+        improved = False
+        for slot in range(len(chosen)):
+            current = _error(total, target, scale)
+            rest = total - grams[slot] * foods[chosen[slot]]
+            amounts, errors = _best_additions(foods, target - rest, scale)
+            errors[~allowed] = np.inf
+            errors[[row for index, row in enumerate(chosen) if index != slot]] = np.inf
+            row = int(np.argmin(errors))
+            if errors[row] < current - 1e-9:
+                chosen[slot], grams[slot] = row, amounts[row]
+                total = rest + amounts[row] * foods[row]
+                improved = True
+        grams = _refit(foods[chosen], grams, target, scale)
+        total = grams @ foods[chosen]
+        if not improved:
+            break
+
+    # Portions people can actually weigh out
+    grams = np.clip(np.round(grams / GRAM_STEP) * GRAM_STEP, MIN_GRAMS, MAX_GRAMS)
+    return chosen, grams
+
+
+def solve_day(foods, allowed, meals, seed):
+    """
+    Solve meals in order, never repeating a food within the day. Restarts
+    other than seed 0 drop a random half of the catalog first, so each one
+    explores different foods. Returns (day error, [(rows, grams)]).
+    """
+    allowed = allowed.copy()
+    if seed:
+        allowed &= np.random.default_rng(seed).random(len(allowed)) < 0.5
+    plan, error = [], 0.0
+    for meal in meals:
+        rows, grams = solve_meal(foods, allowed & ~meal['excluded'], meal['target'], meal['items'])
+        allowed[rows] = False
+        plan.append((rows, grams))
+        total = grams @ foods[rows] if rows else np.zeros(len(meal['target']))
+        error += _error(total, meal['target'], _scale(meal['target']))
+    return error, plan
+
+
+def macro_targets(calories, goal):
+    """Daily [calories, protein g, carbohydrates g, fat g] for a calorie goal and fitness goal."""
+    split = np.array(MACRO_SPLITS.get(goal, DEFAULT_SPLIT))
+    return np.concatenate([[calories], calories * split / KCAL_PER_GRAM])
+
+
+def _id_list(value, name):
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, int) for item in value):
+        raise MealPlanError(f"{name} must be a list of food item ids.")
+    return value
+
+
+class MealPlanner:
+    """
+    Builds a day of meals from the food catalog that hits the user's
+    calorie goal and the macro split of their fitness goal.
+
+    The catalog is the per-gram nutrient matrix; every solver step scores
+    all foods with a few vectorized operations. MEAL_PLAN_RESTARTS
+    independent restarts run on a shared thread pool and the best plan
+    ready within MEAL_PLAN_TIMEOUT seconds wins.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'MEAL_PLAN_WORKERS', 4), thread_name_prefix='meal-plan'
+                )
+            return self._executor
+
+    def _meals(self, options, day_target):
+        """Per-meal targets, food counts and exclusions from the meals option."""
+        requested = options.get('meals') or {meal_type: {} for meal_type in MEAL_TYPES}
+        if isinstance(requested, list) and all(isinstance(meal_type, str) for meal_type in requested):
+            requested = {meal_type: {} for meal_type in requested}
+        if not isinstance(requested, dict):
+            raise MealPlanError("meals must be a list of meal types or an object keyed by meal type.")
+
+        meals = []
+        for meal_type in MEAL_TYPES:
+            if meal_type not in requested:
+                continue
+            meal_options = requested[meal_type] or {}
+            share, items = MEAL_DEFAULTS[meal_type]
+            try:
+                share = float(meal_options.get('share', share))
+                items = int(meal_options.get('items', items))
+            except (TypeError, ValueError, AttributeError):
+                raise MealPlanError(f"Invalid settings for {meal_type}.")
+            if share <= 0 or not 1 <= items <= MAX_ITEMS:
+                raise MealPlanError(f"{meal_type} needs a positive share and 1 to {MAX_ITEMS} items.")
+            meals.append({
+                'meal_type': meal_type, 'share': share, 'items': items,
+                'exclude': _id_list(meal_options.get('exclude'), f'meals.{meal_type}.exclude'),
+            })
+        unknown = set(requested) - set(MEAL_TYPES)
+        if unknown or not meals:
+            raise MealPlanError(f"meals must use the meal types {', '.join(MEAL_TYPES)}.")
+
+        # Shares are relative, so any subset of meals still adds up to the day
+        total_share = sum(meal['share'] for meal in meals)
+        for meal in meals:
+            meal['target'] = day_target * meal['share'] / total_share
+        return meals
+
+    def plan(self, user, options):
+        try:
+            calories = float(options.get('calories') or user.daily_calorie_goal or 2000)
+            tolerance = float(options.get('tolerance', 0.1))
+            seed = int(options.get('seed', 0))
+        except (TypeError, ValueError):
+            raise MealPlanError("calories, tolerance and seed must be numbers.")
+        if not 800 <= calories <= 6000 or not 0 < tolerance < 1:
+            raise MealPlanError("calories must be between 800 and 6000 and tolerance between 0 and 1.")
+
+        goals = set(user.fitness_goals.values_list('name', flat=True))
+        goal = next((name for name in MACRO_SPLITS if name in goals), None)
+        day_target = macro_targets(calories, goal)
+        meals = self._meals(options, day_target)
+
+        ids, matrix = nutrient_matrix.arrays()
+        foods = np.asarray(matrix[:, [COLUMN[MEAL_LOG_FIELDS[field]] for field in FIELDS]], dtype=np.float64)
+        excluded = _id_list(options.get('exclude'), 'exclude')
+        names = options.get('exclude_names') or []
+        if not isinstance(names, list) or not all(isinstance(name, str) and name.strip() for name in names):
+            raise MealPlanError("exclude_names must be a list of words.")
+        if names:
+            query = Q()
+            for name in names:
+                query |= Q(food_name__icontains=name.strip())
+            excluded = excluded + list(FoodItem.objects.filter(query).values_list('id', flat=True))
+        # Foods without calories can't help fill a plan
+        allowed = ~np.isin(ids, excluded) & (foods[:, 0] > 0)
+        for meal in meals:
+            meal['excluded'] = np.isin(ids, meal['exclude'])
+
+        restarts = max(1, getattr(settings, 'MEAL_PLAN_RESTARTS', 4))
+        futures = [
+            self.executor.submit(solve_day, foods, allowed, meals, seed * restarts + restart)
+            for restart in range(restarts)
+        ]
+        done, _ = wait(futures, timeout=getattr(settings, 'MEAL_PLAN_TIMEOUT', 0.2))
+        if not done:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        _, plan = min((future.result() for future in done), key=lambda result: result[0])
+        return self._response(ids, foods, meals, plan, day_target, goal, tolerance)
+
+    def _response(self, ids, foods, meals, plan, day_target, goal, tolerance):
+        food_ids = [int(ids[row]) for rows, _ in plan for row in rows]
+        names = dict(FoodItem.objects.filter(pk__in=food_ids).values_list('id', 'food_name'))
+
+        def values(vector, digits=1):
+            return dict(zip(FIELDS, np.round(vector, digits).tolist()))
+
+        result_meals, day_total = [], np.zeros(len(FIELDS))
+        for meal, (rows, grams) in zip(meals, plan):
+            items = [
+                {'food_item': int(ids[row]), 'food_name': names.get(int(ids[row])), 'quantity': float(amount), **values(amount * foods[row])}
+                for row, amount in zip(rows, grams)
+            ]
+            total = grams @ foods[rows] if rows else np.zeros(len(FIELDS))
+            day_total += total
+            result_meals.append({
+                'meal_type': meal['meal_type'], 'items': items, 'totals': values(total), 'targets': values(meal['target']),
+            })
+        return {
+            'goal': goal,
+            'targets': values(day_target),
+            'totals': values(day_total),
+            'within_tolerance': bool(np.all(np.abs(day_total - day_target) <= tolerance * day_target)),
+            'meals': result_meals,
+        }
+
+
+meal_planner = MealPlanner()
@@ -0,0 +1,242 @@
+import atexit
+import glob
+import ipaddress
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .cache import dashboard_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'fitsync_http_requests_total': ('counter', 'HTTP requests by route, method and status.', None),
+    'fitsync_http_request_duration_seconds': ('histogram', 'HTTP request latency by route.', LATENCY_BUCKETS),
+    'fitsync_http_requests_in_flight': ('gauge', 'HTTP requests currently being handled, by route.', None),
+    'fitsync_db_queries_per_request': ('histogram', 'Database queries issued per request, by route.', QUERY_BUCKETS),
+    'fitsync_cache_hits_total': ('counter', 'Cache hits by cache.', None),
+    'fitsync_cache_misses_total': ('counter', 'Cache misses by cache.', None),
+}
+
+
+class Registry:
+    """
+    In-process metric values. Updates take one short lock; nothing is
+    formatted until a scrape.
+
+    With settings.METRICS_MULTIPROC_DIR set, every process writes its values
+    to <dir>/metrics-<pid>.json at most once per METRICS_FLUSH_INTERVAL, and
+    a scrape served by any worker merges all the files, so several gunicorn
+    or uvicorn workers behind one scrape target report combined numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One slot per bucket plus +Inf, then the sum
+                counts = self._values[key] = [0] * (len(buckets) + 2)
+            counts[bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            values = [
+                [name, list(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+        stats = dashboard_cache.stats()
+        values.append(['fitsync_cache_hits_total', [['cache', 'dashboard']], stats['hits']])
+        values.append(['fitsync_cache_misses_total', [['cache', 'dashboard']], stats['misses']])
+        return values
+
+    @property
+    def directory(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def flush(self, force=False):
+        directory = self.directory
+        now = time.monotonic()
+        if not directory or (not force and now - self._last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 1)):
+            return
+        self._last_flush = now
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        # Write then rename so a concurrent scrape never reads half a file
+        with open(path + '.tmp', 'w') as file:
+            json.dump({'pid': os.getpid(), 'values': self.snapshot()}, file)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        """Merged {(name, labels): value} for this process or, in multiprocess mode, every process."""
+        if not self.directory:
+            snapshots = [{'pid': os.getpid(), 'values': self.snapshot()}]
+        else:
+            self.flush(force=True)
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                try:
+                    with open(path) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+
+        merged = {}
+        for snapshot in snapshots:
+            alive = _pid_alive(snapshot['pid'])
+            for name, labels, value in snapshot['values']:
+                if METRICS[name][0] == 'gauge' and not alive:
+                    # A dead worker has nothing in flight; its counters still count
+                    continue
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if isinstance(value, list):
+                    current = merged.setdefault(key, [0] * len(value))
+                    merged[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self):
+        """The merged values in the Prometheus text exposition format."""
+        merged = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (metric, labels), value in sorted(merged.items()):
+                if metric != name:
+                    continue
+                if kind != 'histogram':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], value[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", str(bound)),))} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+        lines.append('# HELP fitsync_cache_hit_ratio Share of cache lookups that were hits.')
+        lines.append('# TYPE fitsync_cache_hit_ratio gauge')
+        for (metric, labels), hits in sorted(merged.items()):
+            if metric == 'fitsync_cache_hits_total':
+                total = hits + merged.get(('fitsync_cache_misses_total', labels), 0)
+                if total:
+                    lines.append(f'fitsync_cache_hit_ratio{_labels(labels)} {_number(hits / total)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+atexit.register(lambda: registry.flush(force=True))
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Record request count, latency, in-flight requests and query count per resolved route."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        # Set by process_view once the URL has resolved; stays None for 404s and /metrics
+        request._metrics_route = None
+        try:
+            with connections['default'].execute_wrapper(counter):
+                response = self.get_response(request)
+        finally:
+            route = request._metrics_route
+            if route is not None:
+                registry.inc('fitsync_http_requests_in_flight', (('route', route),), -1)
+
+        if route is not None or request.resolver_match is None:
+            route = route or 'unmatched'
+            elapsed = time.perf_counter() - started
+            registry.inc('fitsync_http_requests_total', (
+                ('route', route), ('method', request.method), ('status', str(response.status_code)),
+            ))
+            registry.observe('fitsync_http_request_duration_seconds', (('route', route),), elapsed)
+            registry.observe('fitsync_db_queries_per_request', (('route', route),), counter.count)
+        registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # The URL name (e.g. meal-list) keeps label cardinality bounded, unlike the path
+        match = request.resolver_match
+        route = match.view_name or match.route
+        if route != 'metrics':
+            request._metrics_route = route
+            registry.inc('fitsync_http_requests_in_flight', (('route', route),))
+
+
+def _scraper_allowed(address):
+    # REMOTE_ADDR only: forwarded headers are whatever the client says
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    )
+
+
+def metrics_view(request):
+    # Per-route traffic and latency is operational detail: staff or the scraper's addresses only
+    if not request.user.is_staff and not _scraper_allowed(request.META.get('REMOTE_ADDR', '')):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
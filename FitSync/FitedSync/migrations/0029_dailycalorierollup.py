@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FitedSync', '0028_custworkoutlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCalorieRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories_consumed', models.FloatField(default=0)),
+                ('calories_burned_exercise', models.FloatField(default=0)),
+                ('calories_burned_workout', models.FloatField(default=0)),
+                ('calories_burned_custom_workout', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
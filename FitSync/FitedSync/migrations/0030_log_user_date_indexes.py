@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('FitedSync', '0029_dailycalorierollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='custworkoutlog',
+            index=models.Index(fields=['user', 'date', 'routine_name', 'duration_minutes', 'calories_burned'], name='custworkoutlog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exerciselog',
+            index=models.Index(fields=['user', 'date', 'exercise', 'duration_minutes', 'calories_burned'], name='exerciselog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'date', 'meal_type'], name='meal_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meallog',
+            index=models.Index(fields=['user', 'date', 'calories'], name='meallog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userdailylog',
+            index=models.Index(fields=['user', 'date'], name='userdailylog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutlog',
+            index=models.Index(fields=['user', 'date', 'routine_name', 'duration_minutes', 'calories_burned'], name='workoutlog_user_date_idx'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.contrib.auth.models import BaseUserManager
 
+from .calories import burn, custom_workout_met, routine_met
+
 class CustomUserManager(BaseUserManager):
     def create_superuser(self, username, email, password=None, **extra_fields):
         """Create and return a superuser with an email and password."""
@@ -68,6 +70,7 @@ class Exercise(models.Model):
     muscle_gp_details = models.CharField(max_length=100, blank=True, null=True)
     image_url = models.URLField()
     image_url_secondary = models.URLField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -83,6 +86,30 @@ class CustWorkout(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True)
     duration = models.PositiveIntegerField(help_text="Duration in minutes")
     difficulty_level = models.CharField(max_length=20, choices=difficulty_level_choices)
+    # Also touched when the workout's exercises change, see FitedSync.signals
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='custworkout_user_updated_idx'),
+        ]
+
+    def calculate_calories(self, user_weight, duration=None):
+        return self.calculate_calories_bulk([self], user_weight, duration)[self.pk]
+
+    @staticmethod
+    def calculate_calories_bulk(workouts, user_weight, duration=None):
+        """
+        Calories burned for many custom workouts in one batch, keyed by id.
+        Prefetch workout_exercises__exercise to avoid queries per workout.
+        """
+        workouts = list(workouts)
+        calories = burn(
+            [custom_workout_met(workout) for workout in workouts],
+            user_weight,
+            [duration if duration is not None else workout.duration for workout in workouts],
+        )
+        return {workout.pk: value for workout, value in zip(workouts, calories)}
 
 class CustWorkoutLog(models.Model):
     date = models.DateField()
@@ -90,6 +117,14 @@ class CustWorkoutLog(models.Model):
     duration_minutes = models.IntegerField()
     calories_burned = models.FloatField()
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date', 'routine_name', 'duration_minutes', 'calories_burned'],
+                         name='custworkoutlog_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='custworkoutlog_user_upd_idx'),
+        ]
        
 
 class CustWorkoutExercise(models.Model):
@@ -133,14 +168,30 @@ class WorkoutRoutine(models.Model):
     exercises = models.TextField(max_length=100)
     target_muscle_groups = models.CharField(max_length=100)
     notes = models.TextField(blank=True, null=True)
+    # Also touched when the routine's exercises change, see FitedSync.signals
+    updated_at = models.DateTimeField(auto_now=True)
 
     def calculate_calories(self, user_weight, duration):
-        total_calories = 0
-        for workout_exercise in self.workoutexercise_set.all():
-            # Example calorie formula (calories per set, multiplied by exercise duration)
-            calories_burned = (workout_exercise.sets * workout_exercise.reps * user_weight * 0.1) * (duration / 60)
-            total_calories += calories_burned
-        return total_calories
+        return self.calculate_calories_bulk([self], user_weight, duration)[self.pk]
+
+    @staticmethod
+    def calculate_calories_bulk(routines, user_weight, duration=None):
+        """
+        Calories burned for many routines in one batch, keyed by routine id,
+        from the MET of each routine's type and difficulty. duration defaults
+        to each routine's own duration.
+        """
+        routines = list(routines)
+        calories = burn(
+            [routine.met for routine in routines],
+            user_weight,
+            [duration if duration is not None else routine.duration for routine in routines],
+        )
+        return {routine.pk: value for routine, value in zip(routines, calories)}
+
+    @property
+    def met(self):
+        return routine_met(self.workout_type, self.difficulty_level)
 
     def __str__(self):
         return self.name
@@ -157,6 +208,15 @@ class ExerciseLog(models.Model):
     calories_burned = models.IntegerField()
     sets = models.IntegerField(null=True, blank=True)
     reps = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Covers the per-exercise summary over a user's date range
+            models.Index(fields=['user', 'date', 'exercise', 'duration_minutes', 'calories_burned'],
+                         name='exerciselog_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='exerciselog_user_updated_idx'),
+        ]
 
 class WorkoutExercise(models.Model):
     workout = models.ForeignKey(WorkoutRoutine, on_delete=models.CASCADE)
@@ -175,6 +235,14 @@ class WorkoutLog(models.Model):
     routine_name = models.CharField(max_length=255)
     duration_minutes = models.IntegerField()
     calories_burned = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date', 'routine_name', 'duration_minutes', 'calories_burned'],
+                         name='workoutlog_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='workoutlog_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.routine_name} on {self.date}"
@@ -186,11 +254,54 @@ class UserDailyLog(models.Model):
     weight = models.FloatField(null=True, blank=True)
     total_calories_consumed = models.FloatField(default=0)
     total_calories_burned = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='userdailylog_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='userdailylog_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - Log for {self.date}"
 
 
+class CatalogVersion(models.Model):
+    """
+    Version stamp of a read-mostly catalog (foods, exercises, routines),
+    bumped whenever any of its rows change. See FitedSync.catalog.
+    """
+    name = models.CharField(max_length=30, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class DailyCalorieRollup(models.Model):
+    """
+    Per-user daily calorie totals, kept up to date from the log tables by
+    FitedSync.rollups so the calorie chart is a single range read.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    date = models.DateField()
+    calories_consumed = models.FloatField(default=0)
+    calories_burned_exercise = models.FloatField(default=0)
+    calories_burned_workout = models.FloatField(default=0)
+    calories_burned_custom_workout = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'date')
+
+    @property
+    def calories_burned(self):
+        return self.calories_burned_exercise + self.calories_burned_workout + self.calories_burned_custom_workout
+
+    def __str__(self):
+        return f"{self.user.username} - Calorie rollup for {self.date}"
+
+
 class FoodItem(models.Model):
     # Food item information
     food_name = models.CharField(max_length=255)
@@ -223,9 +334,10 @@ class FoodItem(models.Model):
 
     # Nutrition density
     nutrition_density = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return self.food
+        return self.food_name
 
 class MealLog(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -246,13 +358,25 @@ class MealLog(models.Model):
     protein = models.FloatField(editable=False, null=True)
     carbohydrates = models.FloatField(editable=False, null=True)
     fat = models.FloatField(editable=False, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Covers the daily calorie rollup aggregate
+            models.Index(fields=['user', 'date', 'calories'], name='meallog_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='meallog_user_updated_idx'),
+        ]
+
+    @staticmethod
+    def compute_nutrients(food_item_id, quantity):
+        """Nutrient values for quantity grams of a food, from the per-gram nutrient matrix."""
+        from .nutrients import nutrient_matrix
+        return nutrient_matrix.meal_log_values([food_item_id], [quantity])[0]
 
     def save(self, *args, **kwargs):
         # Automatically calculate nutrient values based on the food item and quantity
-        self.calories = (self.food_item.caloric_value * self.quantity) / 100
-        self.protein = (self.food_item.protein * self.quantity) / 100
-        self.carbohydrates = (self.food_item.carbohydrates * self.quantity) / 100
-        self.fat = (self.food_item.fat * self.quantity) / 100
+        for field, value in self.compute_nutrients(self.food_item_id, self.quantity).items():
+            setattr(self, field, value)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -264,10 +388,31 @@ class Meal(models.Model):
     meal_type = models.CharField(max_length=50)  # e.g., Breakfast, Lunch, Dinner
     meal_logs = models.ManyToManyField(MealLog, related_name='meals')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date', 'meal_type'], name='meal_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.meal_type} on {self.date}"
 
 
+class Tombstone(models.Model):
+    """A deleted row of a synced model, kept so /api/sync/ can report the deletion."""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+
 class Goal(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     goal_type = models.CharField(max_length=50, choices=[('Weight Loss', 'Weight Loss'), ('Caloric Intake', 'Caloric Intake')])
@@ -0,0 +1,412 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .catalog import FOODS, catalog_versions
+from .models import FoodItem, MealLog
+
+logger = logging.getLogger(__name__)
+
+# Every additive FoodItem nutrient, in matrix column order (values are per 100 g).
+# FoodItem has 21 numeric columns. nutrition_density is the one left out: it
+# scores the food as a whole, so it neither scales with grams nor adds up
+# across foods. FoodTable still filters and sorts on it.
+NUTRIENTS = (
+    'caloric_value', 'fat', 'saturated_fats', 'monounsaturated_fats', 'polyunsaturated_fats',
+    'carbohydrates', 'sugars', 'protein', 'cholesterol', 'sodium', 'water',
+    'vitamin_a', 'vitamin_b1', 'vitamin_b2', 'vitamin_c', 'vitamin_d', 'vitamin_e', 'vitamin_k',
+    'calcium', 'iron',
+)
+COLUMN = {name: index for index, name in enumerate(NUTRIENTS)}
+
+# MealLog fields -> matrix columns
+MEAL_LOG_FIELDS = {
+    'calories': 'caloric_value',
+    'protein': 'protein',
+    'carbohydrates': 'carbohydrates',
+    'fat': 'fat',
+}
+
+# Units of the catalog values
+UNITS = {
+    'caloric_value': 'kcal', 'cholesterol': 'mg', 'vitamin_a': 'mg', 'vitamin_b1': 'mg', 'vitamin_b2': 'mg',
+    'vitamin_c': 'mg', 'vitamin_d': 'mg', 'vitamin_e': 'mg', 'vitamin_k': 'mg', 'calcium': 'mg', 'iron': 'mg',
+}
+# Adult daily values (FDA labelling) in those units; nutrients without one are left out.
+# Calories use the user's daily_calorie_goal when set.
+DAILY_VALUES = {
+    'caloric_value': 2000, 'fat': 78, 'saturated_fats': 20, 'carbohydrates': 275, 'sugars': 50,
+    'protein': 50, 'cholesterol': 300, 'sodium': 2.3, 'vitamin_a': 0.9, 'vitamin_b1': 1.2,
+    'vitamin_b2': 1.3, 'vitamin_c': 90, 'vitamin_d': 0.02, 'vitamin_e': 15, 'vitamin_k': 0.12,
+    'calcium': 1300, 'iron': 18,
+}
+
+
+class UnknownFood(KeyError):
+    """Raised for food ids that are not in the catalog."""
+
+
+def catalog_key(stamp):
+    """
+    Content key of the food catalog at a version stamp: the version plus a
+    hash of the stamp, the row count, the highest id and the latest update.
+    Version numbers repeat after a rollback or a database reset or restore,
+    so caches keyed on them alone can serve another catalog's rows.
+    """
+    state = FoodItem.objects.aggregate(Count('pk'), Max('pk'), Max('updated_at'))
+    digest = hashlib.blake2b(repr((stamp, sorted(state.items()))).encode(), digest_size=8).hexdigest()
+    return f'{stamp[0]}-{digest}'
+
+
+class NutrientMatrix:
+    """
+    Nutrients per gram of every FoodItem as a dense float32 matrix, one row
+    per food in id order.
+
+    The matrix is built from the database once per catalog_key and saved
+    under NUTRIENT_CACHE_DIR; other processes memory-map that file instead
+    of querying. FoodItem writes (signals and import_data) bump the catalog
+    version, which every process picks up; an id missing from the matrix
+    forces one fresh check and a rebuild from the database. Null nutrients
+    count as zero.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._key = None
+        self._ids = None
+        self._matrix = None
+
+    @property
+    def directory(self):
+        return getattr(settings, 'NUTRIENT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache'))
+
+    def _paths(self, key):
+        return (
+            os.path.join(self.directory, f'nutrient-ids-{key}.npy'),
+            os.path.join(self.directory, f'nutrients-{key}.npy'),
+        )
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = self._key = None
+
+    def _load(self, key, rebuild=False):
+        ids_path, matrix_path = self._paths(key)
+        if not rebuild:
+            try:
+                return np.load(ids_path), np.load(matrix_path, mmap_mode='r')
+            except (OSError, ValueError):
+                pass
+
+        rows = list(FoodItem.objects.order_by('pk').values_list('pk', *NUTRIENTS))
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        matrix = np.array([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), len(NUTRIENTS))
+        matrix = (np.nan_to_num(matrix) / 100).astype(np.float32)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for path, array in ((ids_path, ids), (matrix_path, matrix)):
+                # Write then rename so another process never maps half a file
+                with open(path + '.tmp', 'wb') as file:
+                    np.save(file, array)
+                os.replace(path + '.tmp', path)
+            self._prune(key)
+        except OSError:
+            logger.warning("Could not write the nutrient matrix cache", exc_info=True)
+        logger.info("Built nutrient matrix for %d foods", len(ids))
+        return ids, matrix
+
+    def _prune(self, key):
+        keep = {os.path.basename(path) for path in self._paths(key)}
+        for name in os.listdir(self.directory):
+            if name.startswith('nutrient') and name.endswith('.npy') and name not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _refresh(self, stamp, rebuild=False):
+        # Called with the lock held; a new stamp with the same contents keeps the matrix
+        key = catalog_key(stamp)
+        if rebuild or key != self._key or self._matrix is None:
+            self._ids, self._matrix = self._load(key, rebuild)
+            self._key = key
+        self._stamp = stamp
+
+    def arrays(self):
+        """(ids, matrix) for the current catalog version."""
+        stamp = catalog_versions.get(FOODS)
+        with self._lock:
+            if self._stamp != stamp or self._matrix is None:
+                self._refresh(stamp)
+            return self._ids, self._matrix
+
+    @staticmethod
+    def _find(ids, food_ids):
+        rows = np.searchsorted(ids, food_ids)
+        rows[rows >= len(ids)] = 0
+        found = ids[rows] == food_ids if len(ids) else np.zeros(len(food_ids), dtype=bool)
+        return rows, found
+
+    def rows(self, food_ids):
+        """(row index for each food id, matrix); UnknownFood if any id is missing."""
+        food_ids = np.asarray(food_ids, dtype=np.int64)
+        ids, matrix = self.arrays()
+        rows, found = self._find(ids, food_ids)
+        if not found.all():
+            # Possibly added since the version stamp was cached; rebuild from the database once
+            stamp = catalog_versions.get(FOODS, fresh=True)
+            with self._lock:
+                self._refresh(stamp, rebuild=True)
+                ids, matrix = self._ids, self._matrix
+            rows, found = self._find(ids, food_ids)
+            if not found.all():
+                raise UnknownFood(food_ids[~found].tolist())
+        return rows, matrix
+
+    def items(self, food_ids, grams):
+        """Nutrients of each (food id, grams) pair, one row per pair."""
+        rows, matrix = self.rows(food_ids)
+        return matrix[rows] * np.asarray(grams, dtype=np.float32)[:, None]
+
+    def total(self, food_ids, grams):
+        """Summed nutrients of all (food id, grams) pairs: one matrix-vector product."""
+        rows, matrix = self.rows(food_ids)
+        return np.asarray(grams, dtype=np.float32) @ matrix[rows]
+
+    def meal_log_values(self, food_ids, grams):
+        """The stored MealLog nutrient fields for each (food id, grams) pair."""
+        values = self.items(food_ids, grams)[:, [COLUMN[name] for name in MEAL_LOG_FIELDS.values()]]
+        # float32 noise past three decimals is not information
+        return [dict(zip(MEAL_LOG_FIELDS, row)) for row in np.round(values.astype(np.float64), 3).tolist()]
+
+
+nutrient_matrix = NutrientMatrix()
+
+
+class SimilarFoods:
+    """
+    Nearest foods by nutrient profile, for suggesting substitutes.
+
+    Every food's nutrients are log-scaled (they are heavily skewed) and
+    standardized per column, so each nutrient counts the same. A lookup is
+    one brute-force distance pass over those vectors with NumPy, which for
+    a catalog this size beats building a tree. The vectors are rebuilt
+    whenever the nutrient matrix is reloaded, so they share its catalog_key.
+    """
+    default_limit = 10
+    max_limit = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None
+        self._arrays = None
+
+    def arrays(self):
+        """(ids, per-gram values, standardized vectors, squared vector norms)."""
+        ids, matrix = nutrient_matrix.arrays()
+        with self._lock:
+            if self._source is not matrix:
+                values = np.asarray(matrix, dtype=np.float64)
+                scaled = np.log1p(np.maximum(values * 100, 0))
+                spread = scaled.std(axis=0)
+                spread[spread == 0] = 1
+                vectors = (scaled - scaled.mean(axis=0)) / spread
+                self._arrays = ids, values, vectors, (vectors * vectors).sum(axis=1)
+                self._source = matrix
+            return self._arrays
+
+    def ensure_built(self):
+        self.arrays()
+
+    def similar(self, food_id, limit=None, less=(), more=(), same=(), tolerance=0.1):
+        """
+        [(food id, distance)] of the foods closest to food_id, nearest first.
+        Only foods with less of every nutrient in less, more of every one in
+        more and within tolerance (relative) of every one in same qualify.
+        """
+        limit = min(limit or self.default_limit, self.max_limit)
+        ids, values, vectors, norms = self.arrays()
+        row = int(np.searchsorted(ids, food_id))
+        if row >= len(ids) or ids[row] != food_id:
+            raise UnknownFood([food_id])
+
+        allowed = np.ones(len(ids), dtype=bool)
+        allowed[row] = False
+        source = values[row]
+        # Filters compare per-gram values, so they hold per 100 g too
+        for name in less:
+            allowed &= values[:, COLUMN[name]] < source[COLUMN[name]]
+        for name in more:
+            allowed &= values[:, COLUMN[name]] > source[COLUMN[name]]
+        for name in same:
+            allowed &= np.abs(values[:, COLUMN[name]] - source[COLUMN[name]]) <= tolerance * abs(source[COLUMN[name]])
+
+        distances = norms + norms[row] - 2 * (vectors @ vectors[row])
+        distances[~allowed] = np.inf
+        nearest = np.argpartition(distances, limit)[:limit] if len(ids) > limit else np.arange(len(ids))
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        nearest = nearest[np.isfinite(distances[nearest])]
+        return list(zip(ids[nearest].tolist(), np.sqrt(np.maximum(distances[nearest], 0)).tolist()))
+
+
+similar_foods = SimilarFoods()
+
+
+class FoodTable:
+    """
+    Column-wise in-memory copy of the food catalog for range filters and
+    sorting: the ids, one float64 array per nutrient column (NaN for nulls,
+    values per 100 g as stored) and the rank of every name. Rebuilt once
+    per catalog_key.
+    """
+    COLUMNS = NUTRIENTS + ('nutrition_density',)
+    OPERATORS = {
+        'exact': np.equal, 'gt': np.greater, 'gte': np.greater_equal, 'lt': np.less, 'lte': np.less_equal,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._key = None
+        self._arrays = None
+
+    def _build(self):
+        rows = list(FoodItem.objects.order_by('pk').values_list('pk', 'food_name', *self.COLUMNS))
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        values = np.array([row[2:] for row in rows], dtype=np.float64).reshape(len(rows), len(self.COLUMNS))
+        # Fortran order keeps every column contiguous for the masks
+        values = np.asfortranarray(values)
+        columns = {name: values[:, index] for index, name in enumerate(self.COLUMNS)}
+        name_rank = np.empty(len(rows), dtype=np.int64)
+        name_rank[np.argsort(np.array([row[1].lower() for row in rows], dtype=str), kind='stable')] = np.arange(len(rows))
+        logger.info("Built food table for %d foods", len(ids))
+        return ids, columns, name_rank
+
+    def arrays(self):
+        """(ids, {column: values}, name ranks) for the current catalog version."""
+        stamp = catalog_versions.get(FOODS)
+        with self._lock:
+            if self._stamp != stamp or self._arrays is None:
+                key = catalog_key(stamp)
+                if key != self._key or self._arrays is None:
+                    self._arrays = self._build()
+                    self._key = key
+                self._stamp = stamp
+            return self._arrays
+
+    def ensure_built(self):
+        self.arrays()
+
+    def query(self, filters=(), ordering=(), ids=None):
+        """
+        Ids of the foods that pass every (column, lookup, value) filter, and
+        are in ids when given, sorted by ordering: column names, '-' for
+        descending, plus food_name and id. Nulls fail every comparison and
+        sort last; ties fall back to id.
+        """
+        food_ids, columns, name_rank = self.arrays()
+        mask = np.ones(len(food_ids), dtype=bool)
+        for column, lookup, value in filters:
+            if lookup == 'isnull':
+                mask &= np.isnan(columns[column]) == value
+            else:
+                mask &= self.OPERATORS[lookup](columns[column], value)
+        if ids is not None:
+            mask &= np.isin(food_ids, np.asarray(ids, dtype=np.int64))
+        rows = np.flatnonzero(mask)
+
+        # lexsort sorts by the last key first
+        keys = [food_ids[rows]]
+        for name in reversed(ordering):
+            descending, name = name.startswith('-'), name.lstrip('-')
+            if name == 'id':
+                key = food_ids[rows]
+            elif name == 'food_name':
+                key = name_rank[rows]
+            else:
+                key = columns[name][rows]
+            keys.append(-key if descending else key)
+        return food_ids[rows[np.lexsort(keys)]]
+
+
+food_table = FoodTable()
+
+
+def daily_values(user):
+    values = dict(DAILY_VALUES)
+    if user.daily_calorie_goal:
+        values['caloric_value'] = user.daily_calorie_goal
+    return values
+
+
+def _rounded(names, rows, digits):
+    return [dict(zip(names, row)) for row in np.round(rows, digits).tolist()]
+
+
+def nutrition_report(user, start, end):
+    """
+    Every nutrient the user ate per logged day from start to end, with the
+    percentage of the daily value, plus per-week daily averages (weeks start
+    on Monday).
+
+    All (food, grams, date) rows come from one query; the nutrients are one
+    gather over the matrix and each day and week is a single reduceat.
+    """
+    rows = list(
+        MealLog.objects.filter(user=user, date__range=(start, end))
+        .order_by('date').values_list('food_item_id', 'quantity', 'date')
+    )
+    targets = daily_values(user)
+    report = {
+        'start': start,
+        'end': end,
+        'nutrients': {
+            name: {'unit': UNITS.get(name, 'g'), 'daily_value': targets.get(name)} for name in NUTRIENTS
+        },
+        'days': [],
+        'weeks': [],
+    }
+    if not rows:
+        return report
+
+    food_ids, grams, dates = zip(*rows)
+    values = nutrient_matrix.items(food_ids, grams).astype(np.float64)
+    ordinals = np.fromiter((day.toordinal() for day in dates), dtype=np.int64, count=len(dates))
+    day_starts = np.flatnonzero(np.diff(ordinals, prepend=-1))
+    day_totals = np.add.reduceat(values, day_starts, axis=0)
+    days = ordinals[day_starts]
+
+    # Ordinal 1 is a Monday
+    weeks = days - (days - 1) % 7
+    week_starts = np.flatnonzero(np.diff(weeks, prepend=-1))
+    days_logged = np.diff(week_starts, append=len(days))
+    week_averages = np.add.reduceat(day_totals, week_starts, axis=0) / days_logged[:, None]
+
+    percent_names = [name for name in NUTRIENTS if name in targets]
+    percent_columns = [COLUMN[name] for name in percent_names]
+    percent_targets = np.array([targets[name] for name in percent_names], dtype=np.float64)
+
+    def percent(totals):
+        return _rounded(percent_names, totals[:, percent_columns] / percent_targets * 100, 1)
+
+    report['days'] = [
+        {'date': date.fromordinal(day), 'totals': totals, 'percent_daily_value': percents}
+        for day, totals, percents in zip(
+            days.tolist(), _rounded(NUTRIENTS, day_totals, 3), percent(day_totals)
+        )
+    ]
+    report['weeks'] = [
+        {'week_start': date.fromordinal(week), 'days_logged': count, 'average': average, 'percent_daily_value': percents}
+        for week, count, average, percents in zip(
+            weeks[week_starts].tolist(), days_logged.tolist(), _rounded(NUTRIENTS, week_averages, 3), percent(week_averages)
+        )
+    ]
+    return report
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class DateKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (date, id), newest first.
+
+    Pages are fetched with a WHERE on the last seen (date, id) instead of an
+    OFFSET, so every page costs the same no matter how deep into a user's
+    history it is. Cursors are opaque base64 tokens.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    # Read for every row on the page, so never deferred by ?fields=
+    required_columns = ('date', 'id')
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'LOG_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'LOG_MAX_PAGE_SIZE', 500)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return max(1, min(requested, max_page_size))
+
+    def encode_cursor(self, row, reverse):
+        payload = json.dumps([row.date.isoformat(), row.pk, int(reverse)], separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            cursor_date, pk, reverse = json.loads(payload)
+            return date.fromisoformat(cursor_date), int(pk), bool(reverse)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        reverse = False
+        queryset = queryset.order_by('-date', '-id')
+        if cursor is not None:
+            cursor_date, pk, reverse = cursor
+            if reverse:
+                # Walking back towards newer rows, nearest first
+                queryset = queryset.filter(
+                    Q(date__gt=cursor_date) | Q(date=cursor_date, id__gt=pk)
+                ).order_by('date', 'id')
+            else:
+                queryset = queryset.filter(Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=pk))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not (self.page and self.has_next):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not (self.page and self.has_previous):
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+
+class FoodQueryPagination(LimitOffsetPagination):
+    """?limit= / ?offset= over the id lists of filtered food catalog queries."""
+
+    def get_limit(self, request):
+        self.default_limit = getattr(settings, 'FOOD_PAGE_SIZE', 50)
+        self.max_limit = getattr(settings, 'FOOD_MAX_PAGE_SIZE', 500)
+        return super().get_limit(request)
@@ -0,0 +1,138 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Reduce a query to its shape, so the same query with other parameters matches."""
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', sql).strip())
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.fingerprints = Counter()
+        # Nested serializer .data calls must not be counted twice
+        self.serializer_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+
+def current_profile():
+    """The profile of the request being handled on this thread, if profiling is on."""
+    return getattr(_state, 'profile', None)
+
+
+def _timed_data(prop):
+    def data(self):
+        profile = current_profile()
+        if profile is None:
+            return prop.fget(self)
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_seconds += time.perf_counter() - started
+    data._profiled = True
+    return property(data)
+
+
+def _instrument_serializers():
+    # Serialization happens when a view reads serializer.data, so time that property
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, '_profiled', False):
+            cls.data = _timed_data(cls.data)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in per-request profiling, enabled with settings.REQUEST_PROFILING.
+
+    Records wall time, SQL query count and time, repeated query shapes and
+    serializer time for every request, returns them in Server-Timing headers
+    and logs one JSON line per request. Requests over PROFILING_QUERY_BUDGET
+    queries or PROFILING_LATENCY_BUDGET_MS are logged as warnings.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = getattr(settings, 'PROFILING_QUERY_BUDGET', 30)
+        self.latency_budget_ms = getattr(settings, 'PROFILING_LATENCY_BUDGET_MS', 500)
+        _instrument_serializers()
+
+    def __call__(self, request):
+        profile = _state.profile = RequestProfile()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+        finally:
+            _state.profile = None
+        total_ms = (time.perf_counter() - started) * 1000
+
+        duplicates = profile.duplicates()
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={profile.sql_seconds * 1000:.1f};desc="{profile.queries} queries"',
+            f'serializer;dur={profile.serializer_seconds * 1000:.1f}',
+            f'dup;desc="{sum(count - 1 for _, count in duplicates)} repeated queries"',
+        ])
+        self.log(request, response, profile, total_ms, duplicates)
+        return response
+
+    def log(self, request, response, profile, total_ms, duplicates):
+        over_budget = []
+        if profile.queries > self.query_budget:
+            over_budget.append('queries')
+        if total_ms > self.latency_budget_ms:
+            over_budget.append('latency')
+
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_seconds * 1000, 2),
+            'serializer_ms': round(profile.serializer_seconds * 1000, 2),
+            'duplicate_queries': [{'sql': sql[:200], 'count': count} for sql, count in duplicates[:5]],
+            'over_budget': over_budget,
+        }
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
@@ -0,0 +1,40 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional C-accelerated encoder
+    orjson = None
+
+_default = encoders.JSONEncoder().default
+
+
+class RawJSON(bytes):
+    """Already encoded JSON; FastJSONRenderer sends it as is."""
+
+
+def encode_json(data):
+    """Compact UTF-8 JSON bytes, formatted the way DRF's JSONRenderer would."""
+    if orjson is not None:
+        # Datetimes go through DRF's encoder so their format matches JSONRenderer
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed and passes
+    RawJSON payloads (e.g. lists assembled from cached fragments) straight
+    through. Indented output falls back to the standard renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, RawJSON):
+            return bytes(data)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return encode_json(data)
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import CustWorkoutLog, DailyCalorieRollup, ExerciseLog, MealLog, WorkoutLog
+
+# Log model -> (calorie field on the log, column on DailyCalorieRollup)
+ROLLUP_SOURCES = {
+    MealLog: ('calories', 'calories_consumed'),
+    ExerciseLog: ('calories_burned', 'calories_burned_exercise'),
+    WorkoutLog: ('calories_burned', 'calories_burned_workout'),
+    CustWorkoutLog: ('calories_burned', 'calories_burned_custom_workout'),
+}
+
+ROLLUP_BATCH_SIZE = 1000
+
+
+def refresh_daily_rollup(model, user_id, date):
+    """
+    Recompute the rollup column fed by model for one user and day.
+
+    Only the affected (user, date) cell is touched, so a log write costs one
+    indexed aggregate plus an upsert instead of a rebuild.
+    """
+    source_field, column = ROLLUP_SOURCES[model]
+    total = (
+        model.objects.filter(user_id=user_id, date=date)
+        .aggregate(total=Sum(source_field))['total']
+    ) or 0
+    DailyCalorieRollup.objects.update_or_create(
+        user_id=user_id,
+        date=date,
+        defaults={column: total},
+    )
+
+
+def rebuild_daily_rollups(user_ids=None):
+    """
+    Rebuild the rollup table from the log tables, for every user or only
+    the given ones. Returns the number of rollup rows written.
+    """
+    rollups = {}
+    for model, (source_field, column) in ROLLUP_SOURCES.items():
+        rows = model.objects.all()
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+        totals = rows.values('user_id', 'date').annotate(total=Sum(source_field)).order_by()
+        for row in totals:
+            key = (row['user_id'], row['date'])
+            if key not in rollups:
+                rollups[key] = DailyCalorieRollup(user_id=key[0], date=key[1])
+            setattr(rollups[key], column, row['total'] or 0)
+
+    with transaction.atomic():
+        existing = DailyCalorieRollup.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        existing.delete()
+        DailyCalorieRollup.objects.bulk_create(rollups.values(), batch_size=ROLLUP_BATCH_SIZE)
+    return len(rollups)
@@ -0,0 +1,511 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from django.db import DatabaseError
+
+from .catalog import EXERCISES, FOODS, catalog_versions
+from .models import Exercise, FoodItem
+from .nutrients import food_table, similar_foods
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lowercase text and split it into alphanumeric tokens."""
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+def trigrams(token):
+    padded = f'${token}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a, b, max_distance=None):
+    """Edit distance between two strings, giving up early past max_distance."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class CatalogIndex:
+    """
+    Base for the in-memory indexes. The index is built on first use and
+    rebuilt whenever its catalog's version stamp moves. Every catalog write
+    bumps the stamp (FitedSync.signals, import_data), so the writing process
+    and all others pick it up the same way. The whole stamp is compared, as
+    version numbers alone repeat after a rollback or database restore.
+    """
+    catalog = None
+    _stamp = None
+
+    def ensure_built(self):
+        stamp = catalog_versions.get(self.catalog)
+        if not self._ready or self._stamp != stamp:
+            with self._lock:
+                if not self._ready or self._stamp != stamp:
+                    self.build()
+                    self._stamp = stamp
+
+
+class FoodSearchIndex(CatalogIndex):
+    """
+    In-memory token/trigram index over FoodItem.food_name.
+
+    Rebuilt when the food catalog version changes, so autocomplete queries
+    never touch the food table.
+    """
+    catalog = FOODS
+    # Columns returned with each hit; enough for the food picker
+    FIELDS = ('id', 'food_name', 'caloric_value', 'protein', 'carbohydrates', 'fat')
+    default_limit = 20
+    max_limit = 100
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ready = False
+        self._reset()
+
+    def _reset(self):
+        self._rows = {}             # food id -> row dict
+        self._names = {}            # food id -> normalized name
+        self._postings = {}         # token -> set of food ids
+        self._sorted_tokens = []    # sorted tokens for prefix range scans
+        self._token_trigrams = {}   # trigram -> set of tokens, for fuzzy matching
+
+    def build(self):
+        rows = FoodItem.objects.values(*self.FIELDS)
+        with self._lock:
+            self._ready = False
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self._sorted_tokens = sorted(self._postings)
+            self._ready = True
+        logger.info("Built food search index with %d items", len(self._rows))
+
+    def invalidate(self):
+        """Drop the index so it is rebuilt on the next query."""
+        with self._lock:
+            self._ready = False
+            self._reset()
+
+    def _add(self, row):
+        food_id = row['id']
+        name = normalize(row['food_name'])
+        self._rows[food_id] = row
+        self._names[food_id] = name
+        for token in set(name.split()):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                for gram in trigrams(token):
+                    self._token_trigrams.setdefault(gram, set()).add(token)
+            postings.add(food_id)
+
+    def _prefix_matches(self, prefix):
+        """Food ids whose name has a token starting with prefix."""
+        ids = set()
+        start = bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            ids |= self._postings[token]
+        return ids
+
+    def _fuzzy_matches(self, term):
+        """Map of food id -> edit distance for tokens close to term."""
+        max_distance = max(1, len(term) // 4)
+        grams = trigrams(term)
+        shared = {}
+        for gram in grams:
+            for token in self._token_trigrams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+
+        # Each edit breaks at most three trigrams, so tokens sharing fewer
+        # than that can be skipped without computing the distance
+        min_shared = len(grams) - 3 * max_distance
+        matches = {}
+        for token, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = levenshtein(term, token, max_distance)
+            if distance > max_distance:
+                continue
+            for food_id in self._postings[token]:
+                if distance < matches.get(food_id, max_distance + 1):
+                    matches[food_id] = distance
+        return matches
+
+    def search(self, query, limit=None):
+        """
+        Return up to limit rows ranked by exact name, name prefix, whole-token
+        match, token prefix match and finally edit distance.
+        """
+        limit = min(limit or self.default_limit, self.max_limit)
+        query = normalize(query)
+        if not query:
+            return []
+        self.ensure_built()
+
+        terms = query.split()
+        with self._lock:
+            matched = {}    # food id -> number of query terms matched
+            distance = {}   # food id -> summed edit distance of fuzzy terms
+            for term in terms:
+                ids = self._prefix_matches(term)
+                if ids:
+                    for food_id in ids:
+                        matched[food_id] = matched.get(food_id, 0) + 1
+                    continue
+                for food_id, term_distance in self._fuzzy_matches(term).items():
+                    matched[food_id] = matched.get(food_id, 0) + 1
+                    distance[food_id] = distance.get(food_id, 0) + term_distance
+
+            names = self._names
+            query_terms = set(terms)
+
+            def rank(food_id):
+                name = names[food_id]
+                if name == query:
+                    tier = 0
+                elif name.startswith(query):
+                    tier = 1
+                elif food_id in distance:
+                    tier = 4
+                elif query_terms <= set(name.split()):
+                    tier = 2
+                else:
+                    tier = 3
+                return (-matched[food_id], tier, distance.get(food_id, 0), len(name), name)
+
+            best = heapq.nsmallest(limit, matched, key=rank)
+            return [self._rows[food_id] for food_id in best]
+
+
+class FoodNameResolver(CatalogIndex):
+    """
+    Resolves free-text food names to FoodItem ids without querying.
+
+    Names are normalized (lowercase alphanumeric tokens) and looked up in a
+    hash map, then with their tokens sorted (so "cheese, cream" finds "cream
+    cheese"), then by edit distance among the names sharing enough trigrams.
+    Confidence is 1.0 for an exact match and 1 - distance / length for a
+    fuzzy one; matches below min_confidence are not returned. Rebuilt on a
+    food catalog version change like FoodSearchIndex.
+    """
+    catalog = FOODS
+    min_confidence = 0.75
+    token_order_confidence = 0.95
+    cache_size = 10000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ready = False
+        self._reset()
+
+    def _reset(self):
+        self._ids = {}          # normalized name -> set of food ids
+        self._sorted = {}       # normalized name with sorted tokens -> normalized names
+        self._food_names = {}   # food id -> (food_name, normalized name)
+        self._trigrams = {}     # trigram -> list of normalized names
+        self._cache = {}
+
+    def build(self):
+        rows = FoodItem.objects.values_list('id', 'food_name')
+        with self._lock:
+            self._ready = False
+            self._reset()
+            for food_id, food_name in rows:
+                self._add(food_id, food_name)
+            self._ready = True
+        logger.info("Built food name resolver with %d names", len(self._ids))
+
+    def invalidate(self):
+        with self._lock:
+            self._ready = False
+            self._reset()
+
+    def _add(self, food_id, food_name):
+        name = normalize(food_name)
+        if not name:
+            return
+        self._food_names[food_id] = (food_name, name)
+        ids = self._ids.get(name)
+        if ids is None:
+            ids = self._ids[name] = set()
+            self._sorted.setdefault(' '.join(sorted(name.split())), set()).add(name)
+            for gram in trigrams(name):
+                self._trigrams.setdefault(gram, []).append(name)
+        ids.add(food_id)
+
+    def _match(self, name, food_names, confidence):
+        # Several foods can share a name; the oldest row wins
+        candidates = [min(self._ids[food_name]) for food_name in food_names if self._ids.get(food_name)]
+        if not candidates:
+            return None
+        food_id = min(candidates)
+        return {'food_item': food_id, 'food_name': self._food_names[food_id][0], 'confidence': confidence}
+
+    def _lookup(self, name):
+        match = self._match(name, [name], 1.0)
+        if match:
+            return match
+        match = self._match(name, self._sorted.get(' '.join(sorted(name.split())), ()), self.token_order_confidence)
+        if match:
+            return match
+        max_distance = int(len(name) * (1 - self.min_confidence))
+        if max_distance < 1:
+            return None
+
+        grams = trigrams(name)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        # Each edit breaks at most three trigrams, so names sharing fewer
+        # than that can't be within max_distance
+        min_shared = len(grams) - 3 * max_distance
+        best, best_key = None, None
+        for food_name, count in shared.most_common():
+            if count < min_shared:
+                break
+            if not self._ids.get(food_name):
+                continue
+            distance = levenshtein(name, food_name, max_distance)
+            if distance > max_distance:
+                continue
+            # Closest first, then the name closest in length
+            key = (distance, abs(len(food_name) - len(name)), food_name)
+            if best_key is None or key < best_key:
+                best, best_key = food_name, key
+                # Nothing further away can win any more
+                max_distance = distance
+                min_shared = len(grams) - 3 * max_distance
+        if best is None:
+            return None
+        confidence = round(1 - best_key[0] / max(len(name), len(best)), 3)
+        if confidence < self.min_confidence:
+            return None
+        return self._match(name, [best], confidence)
+
+    def resolve(self, text):
+        """{'food_item', 'food_name', 'confidence'} for the best match of text, or None."""
+        name = normalize(text)
+        if not name:
+            return None
+        self.ensure_built()
+        with self._lock:
+            if name in self._cache:
+                return self._cache[name]
+            match = self._lookup(name)
+            if len(self._cache) >= self.cache_size:
+                self._cache = {}
+            self._cache[name] = match
+            return match
+
+    def resolve_many(self, texts):
+        """resolve() for every text, in order; repeated names are looked up once."""
+        return [self.resolve(text) for text in texts]
+
+
+class ExerciseSearchIndex(CatalogIndex):
+    """
+    In-memory BM25 index over the exercise catalog with muscle group and
+    equipment facets.
+
+    Documents are the full exercise rows, so hits are returned without a
+    database round trip. Rebuilt when the exercise catalog version changes.
+    """
+    catalog = EXERCISES
+    # Per-field weights applied to term frequencies (a simplified BM25F)
+    FIELD_WEIGHTS = {
+        'title': 3.0,
+        'muscle_group': 2.0,
+        'equipment': 2.0,
+        'muscle_gp_details': 1.0,
+        'equipment_details': 1.0,
+        'description': 0.5,
+    }
+    FACETS = ('muscle_group', 'equipment')
+    k1 = 1.2
+    b = 0.75
+    default_limit = 20
+    max_limit = 100
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ready = False
+        self._reset()
+
+    def _reset(self):
+        self._rows = {}         # exercise id -> row dict
+        self._lengths = {}      # exercise id -> weighted document length
+        self._postings = {}     # term -> {exercise id: weighted term frequency}
+        self._sorted_terms = []  # sorted terms for prefix expansion
+        self._total_length = 0.0
+        self._facet_ids = {facet: {} for facet in self.FACETS}  # facet -> value -> ids
+
+    def build(self):
+        rows = Exercise.objects.values()
+        with self._lock:
+            self._ready = False
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self._sorted_terms = sorted(self._postings)
+            self._ready = True
+        logger.info("Built exercise search index with %d exercises", len(self._rows))
+
+    def invalidate(self):
+        with self._lock:
+            self._ready = False
+            self._reset()
+
+    @staticmethod
+    def facet_key(value):
+        return (value or '').strip().lower()
+
+    def _add(self, row):
+        exercise_id = row['id']
+        frequencies = {}
+        length = 0.0
+        for field, weight in self.FIELD_WEIGHTS.items():
+            for term in tokenize(row.get(field)):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+
+        self._rows[exercise_id] = row
+        self._lengths[exercise_id] = length
+        self._total_length += length
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+            postings[exercise_id] = frequency
+        for facet in self.FACETS:
+            key = self.facet_key(row.get(facet))
+            self._facet_ids[facet].setdefault(key, set()).add(exercise_id)
+
+    def _expand(self, term):
+        """Terms to look up for a query term; falls back to prefix matches."""
+        if self._postings.get(term):
+            return [term]
+        start = bisect_left(self._sorted_terms, term)
+        expanded = []
+        for candidate in self._sorted_terms[start:]:
+            if not candidate.startswith(term):
+                break
+            expanded.append(candidate)
+        return expanded
+
+    def _score(self, terms):
+        """BM25 scores for every exercise matching at least one term."""
+        count = len(self._rows)
+        avg_length = (self._total_length / count) if count else 1.0
+        scores = {}
+        for term in terms:
+            for indexed_term in self._expand(term):
+                postings = self._postings[indexed_term]
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for exercise_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[exercise_id] / avg_length)
+                    scores[exercise_id] = scores.get(exercise_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def _filter_ids(self, facet, values):
+        ids = set()
+        for value in values:
+            ids |= self._facet_ids[facet].get(self.facet_key(value), set())
+        return ids
+
+    def search(self, query='', filters=None, limit=None, offset=0):
+        """
+        Rank exercises for query and apply facet filters.
+
+        filters maps a facet name to a list of accepted values. Facet counts
+        are disjunctive: each facet is counted with every filter applied
+        except its own, so the UI can offer the alternatives.
+        """
+        limit = min(limit or self.default_limit, self.max_limit)
+        filters = {facet: values for facet, values in (filters or {}).items() if facet in self.FACETS and values}
+        terms = tokenize(query)
+        self.ensure_built()
+
+        with self._lock:
+            if terms:
+                scores = self._score(terms)
+                matched = set(scores)
+            else:
+                scores = {}
+                matched = set(self._rows)
+
+            filter_ids = {facet: self._filter_ids(facet, values) for facet, values in filters.items()}
+            hits = matched
+            for ids in filter_ids.values():
+                hits = hits & ids
+
+            facets = {}
+            for facet in self.FACETS:
+                base = matched
+                for other, ids in filter_ids.items():
+                    if other != facet:
+                        base = base & ids
+                counts = {}
+                for exercise_id in base:
+                    value = self._rows[exercise_id].get(facet) or ''
+                    counts[value] = counts.get(value, 0) + 1
+                facets[facet] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+            rows = self._rows
+            ordered = sorted(hits, key=lambda exercise_id: (-scores.get(exercise_id, 0.0), rows[exercise_id]['title']))
+            return {
+                'count': len(hits),
+                'results': [rows[exercise_id] for exercise_id in ordered[offset:offset + limit]],
+                'facets': facets,
+            }
+
+
+food_index = FoodSearchIndex()
+food_resolver = FoodNameResolver()
+exercise_index = ExerciseSearchIndex()
+
+
+def warm_indexes():
+    """Build the in-memory indexes up front so the first request doesn't pay for it."""
+    try:
+        food_index.ensure_built()
+        food_resolver.ensure_built()
+        exercise_index.ensure_built()
+        similar_foods.ensure_built()
+        food_table.ensure_built()
+    except DatabaseError:
+        logger.warning("Could not warm search indexes; they will be built on first use", exc_info=True)
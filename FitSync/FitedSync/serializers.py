@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .models import *
+from .fieldsets import SparseFieldsetMixin
+from .search import food_resolver
+from .calories import estimate_exercise_logs
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
@@ -15,8 +18,11 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 class CalorieDataSerializer(serializers.Serializer):
     date = serializers.DateField()
-    consumed = serializers.FloatField()
-    burned = serializers.FloatField()
+    consumed = serializers.FloatField(source='calories_consumed')
+    burned = serializers.FloatField(source='calories_burned')
+    burned_exercise = serializers.FloatField(source='calories_burned_exercise')
+    burned_workout = serializers.FloatField(source='calories_burned_workout')
+    burned_custom_workout = serializers.FloatField(source='calories_burned_custom_workout')
 
 
 class FitnessGoalSerializer(serializers.ModelSerializer):
@@ -80,7 +86,7 @@ class UserSerializer(serializers.ModelSerializer):
         
         return user
 
-class ExerciseSerializer(serializers.ModelSerializer):
+class ExerciseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Exercise
         fields = '__all__'
@@ -102,7 +108,7 @@ class CustWorkoutExerciseSerializer(serializers.ModelSerializer):
         model = CustWorkoutExercise
         fields = ['exercise', 'sets', 'repetitions']
 
-class CustWorkoutSerializer(serializers.ModelSerializer):
+class CustWorkoutSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # This field will represent the exercises, including sets and reps.
     workout_exercises = CustWorkoutExerciseSerializer(many=True)
 
@@ -139,11 +145,11 @@ class CustWorkoutSerializer(serializers.ModelSerializer):
             # Now, add the new workout exercises
             for exercise_data in workout_exercises_data:
                 exercise = exercise_data.pop('exercise')
-                WorkoutExercise.objects.create(custom_workout=instance, exercise=exercise, **exercise_data)
+                CustWorkoutExercise.objects.create(workout=instance, exercise=exercise, **exercise_data)
 
         return instance
     
-class WorkoutRoutineSerializer(serializers.ModelSerializer):
+class WorkoutRoutineSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     exercises = WorkoutExerciseSerializer(source='workoutexercise_set', many=True)
     calories_burned = serializers.SerializerMethodField()
 
@@ -169,21 +175,25 @@ class WorkoutRoutineSerializer(serializers.ModelSerializer):
         return instance
 
     def get_calories_burned(self, obj):
+        # Precomputed for the whole page by WorkoutRoutineViewSet.list
+        precomputed = self.context.get('calories_burned')
+        if precomputed is not None and obj.pk in precomputed:
+            return precomputed[obj.pk]
         user_weight = self.context['request'].user.weight
         duration = self.context['request'].data.get('duration', obj.duration)
         return obj.calculate_calories(user_weight, duration)
 
-class FoodItemSerializer(serializers.ModelSerializer):
+class FoodItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = FoodItem
         fields = '__all__'
 
-class UserDailyLogSerializer(serializers.ModelSerializer):
+class UserDailyLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = UserDailyLog
         fields = '__all__'
 
-class MealLogSerializer(serializers.ModelSerializer):
+class MealLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     food_name = serializers.SerializerMethodField()  # Dynamically get food name from food_item
     calories = serializers.FloatField(read_only=True)
     protein = serializers.FloatField(read_only=True)
@@ -193,21 +203,29 @@ class MealLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = MealLog
         fields = '__all__'
+        extra_kwargs = {'food_item': {'required': False}}
 
     def get_food_name(self, obj):
         if obj.food_item:
             return obj.food_item.food_name
         return None
 
-    def create(self, validated_data):
-        food_name = validated_data.pop('food_name', None)
-        if food_name:
-            food_item = FoodItem.objects.filter(name=food_name).first()
-            validated_data['food_item'] = food_item
-        return super().create(validated_data)
-
-
-class MealSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        # food_name is read-only on output; on input it can stand in for food_item
+        food_name = self.initial_data.get('food_name') if hasattr(self, 'initial_data') else None
+        if attrs.get('food_item') is None and food_name:
+            match = food_resolver.resolve(food_name)
+            if match is None:
+                raise serializers.ValidationError({'food_name': f'No food matches "{food_name}".'})
+            attrs['food_item'] = FoodItem.objects.get(pk=match['food_item'])
+        if attrs.get('food_item') is None and self.instance is None:
+            raise serializers.ValidationError({'food_item': 'Provide food_item or food_name.'})
+        if attrs.get('food_item') is not None:
+            attrs['food_name'] = attrs['food_item'].food_name
+        return attrs
+
+
+class MealSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     meal_logs = MealLogSerializer(many=True, read_only=True)  # Nested MealLog serializer
 
     class Meta:
@@ -215,15 +233,18 @@ class MealSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ExerciseLogSerializer(serializers.ModelSerializer):
+class ExerciseLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     exercise = serializers.PrimaryKeyRelatedField(queryset=Exercise.objects.all())  # Accepts ID as input
+    # Estimated from the exercise's MET when left out, see FitedSync.calories
+    calories_burned = serializers.IntegerField(required=False)
 
     class Meta:
         model = ExerciseLog
         fields = ['id', 'user', 'exercise', 'date', 'duration_minutes', 'calories_burned', 'sets', 'reps']
         read_only_fields = ['id', 'user']  # Auto-populated fields
 
-    def create(self, validated_data):
+    def build(self, validated_data):
+        """The unsaved ExerciseLog for validated_data (the batch endpoint bulk inserts these)."""
         user= self.context['request'].user  # Get the user from the request context
         exercise = validated_data['exercise']
         duration_minutes = validated_data.get('duration_minutes')
@@ -232,8 +253,7 @@ class ExerciseLogSerializer(serializers.ModelSerializer):
         date = validated_data.get('date')
         calories_burned = validated_data.get('calories_burned')
 
-        # Create and save the ExerciseLog
-        exercise_log = ExerciseLog.objects.create(
+        return ExerciseLog(
             user=user,
             exercise=exercise,
             duration_minutes=duration_minutes,
@@ -242,50 +262,64 @@ class ExerciseLogSerializer(serializers.ModelSerializer):
             date=date,
             calories_burned=calories_burned
         )
+
+    def create(self, validated_data):
+        # Create and save the ExerciseLog
+        exercise_log = self.build(validated_data)
+        estimate_exercise_logs([exercise_log], exercise_log.user.weight)
+        exercise_log.save()
         return exercise_log
 
-class WorkoutLogSerializer(serializers.ModelSerializer):
+class WorkoutLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = WorkoutLog
         fields = ['id', 'user', 'date', 'routine_name', 'duration_minutes', 'calories_burned']
         read_only_fields = ['id', 'user']
 
-    def create(self, validated_data):
+    def build(self, validated_data):
         user = self.context['request'].user
         date = validated_data.get('date')
         routine_name = validated_data['routine_name']
         duration_minutes = validated_data.get('duration_minutes') 
         calories_burned = validated_data.get('calories_burned')
 
-        workout_log = WorkoutLog.objects.create(
+        return WorkoutLog(
             user=user,
             date=date,
             routine_name=routine_name,
             duration_minutes=duration_minutes,
             calories_burned=calories_burned
         )
+
+    def create(self, validated_data):
+        workout_log = self.build(validated_data)
+        workout_log.save()
         return workout_log
 
-class CustWorkoutLogSerializer(serializers.ModelSerializer):
+class CustWorkoutLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = CustWorkoutLog
         fields = ['id', 'user', 'date', 'routine_name', 'duration_minutes', 'calories_burned']
         read_only_fields = ['id', 'user']
 
-    def create(self, validated_data):
+    def build(self, validated_data):
         user = self.context['request'].user
         date = validated_data.get('date')
         routine_name = validated_data['routine_name']
         duration_minutes = validated_data.get('duration_minutes') 
         calories_burned = validated_data.get('calories_burned')
 
-        cust_workout_log = CustWorkoutLog.objects.create(
+        return CustWorkoutLog(
             user=user,
             date=date,
             routine_name=routine_name,
             duration_minutes=duration_minutes,
             calories_burned=calories_burned
         )
+
+    def create(self, validated_data):
+        cust_workout_log = self.build(validated_data)
+        cust_workout_log.save()
         return cust_workout_log
     
 class GoalSerializer(serializers.ModelSerializer):
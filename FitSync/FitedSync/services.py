@@ -0,0 +1,135 @@
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+
+from .models import FoodItem, Meal, MealLog
+from .nutrients import nutrient_matrix
+from .search import food_resolver
+from .signals import batched_log_updates, log_rows_changed
+
+
+class MealIngestError(ValueError):
+    """Raised when a meal payload is invalid; the message is safe to show to clients."""
+
+
+def _parse_meal_items(food_items_data):
+    """
+    Validate every food item up front and return (food_item_id, quantity,
+    food_name) tuples. Items given by food_name alone are resolved with the
+    in-memory name index, so free-text meals cost no extra queries.
+    """
+    items = []
+    for food_data in food_items_data:
+        food_item_id = food_data.get('food_item')
+        quantity = food_data.get('quantity')
+
+        if not food_item_id and food_data.get('food_name'):
+            match = food_resolver.resolve(food_data['food_name'])
+            if match is None:
+                raise MealIngestError(f"No food matches \"{food_data['food_name']}\".")
+            food_item_id = match['food_item']
+
+        if not food_item_id or not quantity:
+            raise MealIngestError("Each food item must include food_item (or food_name) and quantity.")
+        try:
+            food_item_id = int(food_item_id)
+            quantity = float(quantity)
+        except (TypeError, ValueError):
+            raise MealIngestError("food_item must be an id and quantity a number.")
+        if quantity <= 0:
+            raise MealIngestError("quantity must be greater than zero.")
+
+        items.append((food_item_id, quantity, food_data.get('food_name')))
+    return items
+
+
+def bulk_create_with_ids(model, rows, user):
+    """
+    bulk_create a user's rows and make sure they come back with primary keys.
+
+    Backends without INSERT ... RETURNING (MySQL) leave pk unset, so the
+    user's rows above the highest id seen before the insert are read back
+    and matched to rows by value. Logs the same user writes concurrently
+    (e.g. through the REST endpoints, which take no locks) can land between
+    them, so ids can't be assigned by position; identical rows are
+    interchangeable.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(rows)
+
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and not getattr(field, 'auto_now', False) and not getattr(field, 'auto_now_add', False)
+    ]
+    high_water = model.objects.aggregate(Max('id'))['id__max'] or 0
+    model.objects.bulk_create(rows)
+    waiting = {}
+    for row in rows:
+        key = tuple(field.to_python(getattr(row, field.attname)) for field in fields)
+        waiting.setdefault(key, []).append(row)
+    created = model.objects.filter(user=user, id__gt=high_water).order_by('id')
+    for pk, *values in created.values_list('id', *(field.attname for field in fields)):
+        matches = waiting.get(tuple(field.to_python(value) for field, value in zip(fields, values)))
+        if matches:
+            matches.pop(0).pk = pk
+    return rows
+
+
+def ingest_meal(user, date, meal_type, food_items_data):
+    """
+    Create or replace a user's meal and its meal logs in one transaction.
+
+    All food items are fetched with one query, nutrients are computed for
+    every row in one pass and the logs and M2M rows are bulk inserted.
+    Returns the Meal and its nutrient totals.
+    """
+    items = _parse_meal_items(food_items_data)
+    food_item_ids = {food_item_id for food_item_id, _, _ in items}
+    foods = FoodItem.objects.only('food_name').in_bulk(food_item_ids)
+    if len(foods) != len(food_item_ids):
+        raise MealIngestError("Invalid food item.")
+    nutrients = nutrient_matrix.meal_log_values(
+        [food_item_id for food_item_id, _, _ in items], [quantity for _, quantity, _ in items]
+    )
+
+    meal_logs = [
+        MealLog(
+            user=user,
+            date=date,
+            meal_type=meal_type,
+            food_item=foods[food_item_id],
+            quantity=quantity,
+            food_name=food_name or foods[food_item_id].food_name,
+            **values,
+        )
+        for (food_item_id, quantity, food_name), values in zip(items, nutrients)
+    ]
+
+    with transaction.atomic(), batched_log_updates():
+        # Create or retrieve the meal entry, locking it against concurrent ingests
+        meal, created = Meal.objects.select_for_update().get_or_create(
+            user=user,
+            date=date,
+            meal_type=meal_type
+        )
+
+        # Replace any existing logs for the meal (to avoid duplicates)
+        if not created:
+            MealLog.objects.filter(meals=meal).delete()
+
+        meal_logs = bulk_create_with_ids(MealLog, meal_logs, user)
+        Meal.meal_logs.through.objects.bulk_create([
+            Meal.meal_logs.through(meal_id=meal.id, meallog_id=meal_log.id)
+            for meal_log in meal_logs
+        ])
+
+        totals = MealLog.objects.filter(meals=meal).aggregate(
+            total_calories=Sum('calories'),
+            total_protein=Sum('protein'),
+            total_carbs=Sum('carbohydrates'),
+            total_fat=Sum('fat'),
+        )
+
+        # bulk_create skips the model signals, so record the change here
+        log_rows_changed(MealLog, user.id, [date])
+
+    return meal, {key: value or 0 for key, value in totals.items()}
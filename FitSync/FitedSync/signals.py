@@ -0,0 +1,201 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import dashboard_cache
+from .catalog import EXERCISES, FOODS, ROUTINES, catalog_versions
+from .fragments import exercise_fragments, food_fragments, routine_fragments, touch_routines
+from .models import (
+    CustomUser, CustWorkout, CustWorkoutExercise, Exercise, FoodItem, Tombstone, UserDailyLog,
+    WorkoutExercise, WorkoutRoutine,
+)
+from .rollups import ROLLUP_SOURCES, refresh_daily_rollup
+
+
+@receiver(post_save, sender=FoodItem)
+def food_item_saved(sender, instance, **kwargs):
+    # Every process, this one included, rebuilds its search indexes and
+    # nutrient caches from the moved stamp
+    catalog_versions.bump(FOODS)
+
+
+@receiver(post_delete, sender=FoodItem)
+def food_item_deleted(sender, instance, **kwargs):
+    food_fragments.discard(instance.pk)
+    catalog_versions.bump(FOODS)
+
+
+@receiver(post_save, sender=Exercise)
+def exercise_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_routines(exercise_ids=[instance.pk])
+    # Routines embed their exercises
+    catalog_versions.bump(EXERCISES, ROUTINES)
+
+
+@receiver(post_delete, sender=Exercise)
+def exercise_deleted(sender, instance, **kwargs):
+    exercise_fragments.discard(instance.pk)
+    catalog_versions.bump(EXERCISES, ROUTINES)
+
+
+@receiver(post_save, sender=WorkoutRoutine)
+def workout_routine_saved(sender, instance, **kwargs):
+    catalog_versions.bump(ROUTINES)
+
+
+@receiver(post_delete, sender=WorkoutRoutine)
+def workout_routine_deleted(sender, instance, **kwargs):
+    routine_fragments.discard(instance.pk)
+    catalog_versions.bump(ROUTINES)
+
+
+@receiver(post_save, sender=WorkoutExercise)
+@receiver(post_delete, sender=WorkoutExercise)
+def workout_exercise_changed(sender, instance, **kwargs):
+    touch_routines([instance.workout_id])
+    catalog_versions.bump(ROUTINES)
+
+
+@receiver(m2m_changed, sender=WorkoutRoutine.exercise.through)
+def workout_routine_exercises_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        touch_routines(pk_set if reverse else [instance.pk])
+        catalog_versions.bump(ROUTINES)
+
+
+_pending = threading.local()
+
+
+@contextmanager
+def batched_log_updates():
+    """
+    Collect log changes made inside the block and apply the derived updates
+    once on exit, so bulk writes refresh each (user, date) a single time.
+    """
+    if getattr(_pending, 'keys', None) is not None:
+        # Already batching further up the stack
+        yield
+        return
+
+    _pending.keys = set()
+    _pending.tombstones = []
+    try:
+        yield
+        keys, tombstones = _pending.keys, _pending.tombstones
+    finally:
+        _pending.keys = _pending.tombstones = None
+    Tombstone.objects.bulk_create(tombstones)
+    _apply_log_changes(keys)
+
+
+def _apply_log_changes(keys):
+    for model, user_id, date in keys:
+        if model in ROLLUP_SOURCES:
+            refresh_daily_rollup(model, user_id, date)
+
+    # Invalidate once the data is committed, so a concurrent request can't
+    # re-cache the old rows under the new version
+    days = {(user_id, date) for _, user_id, date in keys}
+
+    def invalidate_days():
+        for user_id, date in days:
+            dashboard_cache.invalidate_day(user_id, date)
+
+    transaction.on_commit(invalidate_days)
+
+
+def log_rows_changed(model, user_id, dates):
+    """
+    Update everything derived from a log table for one user and some dates:
+    the daily calorie rollups and the dashboard cache.
+
+    The signal handlers below call this for single-row writes; code paths
+    that bypass signals (bulk_create, queryset.update) must call it directly.
+    """
+    date_field = model._meta.get_field('date')
+    keys = {(model, user_id, date_field.to_python(date)) for date in dates}
+    pending = getattr(_pending, 'keys', None)
+    if pending is not None:
+        pending |= keys
+        return
+    _apply_log_changes(keys)
+
+
+def log_pre_save(sender, instance, **kwargs):
+    # Remember where the row used to be so a moved log updates both days
+    instance._previous_log_key = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_log_key = (
+            sender._base_manager.filter(pk=instance.pk).values_list('user_id', 'date').first()
+        )
+
+
+def log_post_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_log_key', None)
+    if previous and previous[0] != instance.user_id:
+        log_rows_changed(sender, previous[0], [previous[1]])
+        previous = None
+    dates = [instance.date] + ([previous[1]] if previous else [])
+    log_rows_changed(sender, instance.user_id, dates)
+
+
+def _deleting_user(origin):
+    # True when rows are going away because their user is being deleted
+    return isinstance(origin, CustomUser) or getattr(origin, 'model', None) is CustomUser
+
+
+def log_post_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_user(origin):
+        # Recomputing would recreate rows pointing at the user being deleted
+        return
+    log_rows_changed(sender, instance.user_id, [instance.date])
+
+
+def record_deletion(sender, instance, origin=None, **kwargs):
+    """Leave a tombstone for a deleted synced row so /api/sync/ can report it."""
+    if instance.user_id is None or _deleting_user(origin):
+        return
+    tombstone = Tombstone(user_id=instance.user_id, model=sender._meta.model_name, object_id=instance.pk)
+    pending = getattr(_pending, 'tombstones', None)
+    if pending is not None:
+        pending.append(tombstone)
+    else:
+        tombstone.save()
+
+
+# Log tables whose rows feed the calorie rollups and dashboard cache
+LOG_MODELS = [*ROLLUP_SOURCES, UserDailyLog]
+
+for log_model in LOG_MODELS:
+    pre_save.connect(log_pre_save, sender=log_model, dispatch_uid=f'{log_model.__name__}_pre_save')
+    post_save.connect(log_post_save, sender=log_model, dispatch_uid=f'{log_model.__name__}_post_save')
+    post_delete.connect(log_post_delete, sender=log_model, dispatch_uid=f'{log_model.__name__}_post_delete')
+
+# Per-user tables served by /api/sync/, see FitedSync.sync
+SYNCED_MODELS = [*LOG_MODELS, CustWorkout]
+
+for synced_model in SYNCED_MODELS:
+    post_delete.connect(record_deletion, sender=synced_model, dispatch_uid=f'{synced_model.__name__}_tombstone')
+
+
+@receiver(post_save, sender=CustWorkoutExercise)
+@receiver(post_delete, sender=CustWorkoutExercise)
+def custom_workout_exercise_changed(sender, instance, **kwargs):
+    # The exercises are part of the synced workout, so mark the workout changed
+    CustWorkout.objects.filter(pk=instance.workout_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: dashboard_cache.invalidate_user(instance.pk))
+
+
+@receiver(m2m_changed, sender=CustomUser.fitness_goals.through)
+def user_goals_changed(sender, instance, **kwargs):
+    if isinstance(instance, CustomUser):
+        transaction.on_commit(lambda: dashboard_cache.invalidate_user(instance.pk))
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.utils import timezone
+
+from .catalog import FOODS, catalog_versions
+from .models import FoodItem
+
+SNAPSHOT_FORMAT = 1
+# Every FoodItem column except updated_at, which isn't catalog content
+COLUMNS = [field.attname for field in FoodItem._meta.concrete_fields if field.name != 'updated_at']
+SQLITE_TYPES = {'AutoField': 'INTEGER', 'BigAutoField': 'INTEGER', 'CharField': 'TEXT', 'FloatField': 'REAL'}
+
+
+class SnapshotStore:
+    """
+    Offline copies of the food catalog for mobile clients.
+
+    Each snapshot is a gzipped SQLite database with a `foods` table, named
+    after the SHA-256 of its rows so its URL never changes content. Next to
+    it goes a gzipped JSON diff from the previous snapshot (rows to upsert,
+    ids to delete), so a client on version N downloads only the diffs to
+    the latest one. manifest.json lists both, newest last; only the last
+    FOOD_SNAPSHOT_KEEP versions are kept.
+    """
+
+    @property
+    def directory(self):
+        return getattr(settings, 'FOOD_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'snapshots'))
+
+    @property
+    def keep(self):
+        return getattr(settings, 'FOOD_SNAPSHOT_KEEP', 10)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def manifest(self):
+        try:
+            with open(self.path('manifest.json')) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {'format': SNAPSHOT_FORMAT, 'snapshots': []}
+
+    def latest(self):
+        snapshots = self.manifest()['snapshots']
+        return snapshots[-1] if snapshots else None
+
+    def files(self):
+        """Names of the snapshot and diff files the manifest refers to."""
+        names = set()
+        for entry in self.manifest()['snapshots']:
+            names.update(name for name in (entry['file'], entry['diff']) if name)
+        return names
+
+    def _write(self, name, data):
+        # Write then rename so a concurrent download never reads half a file
+        path = self.path(name)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(data)
+        os.replace(path + '.tmp', path)
+
+    def publish(self, force=False):
+        """
+        Write a new snapshot if the catalog changed since the latest one.
+        Returns the new manifest entry, or None when nothing changed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self.manifest()
+        previous = manifest['snapshots'][-1] if manifest['snapshots'] else None
+        catalog_version, _ = catalog_versions.get(FOODS)
+        if previous and previous['catalog_version'] == catalog_version and not force:
+            return None
+
+        rows = list(FoodItem.objects.order_by('pk').values_list(*COLUMNS))
+        digest = content_hash(rows)
+        if previous and previous['hash'] == digest:
+            # Saved without changing anything the snapshot carries
+            previous['catalog_version'] = catalog_version
+            self._write('manifest.json', json.dumps(manifest).encode())
+            return None
+
+        entry = {
+            'version': previous['version'] + 1 if previous else 1,
+            'catalog_version': catalog_version,
+            'hash': digest,
+            'file': f'foods-{digest[:16]}.sqlite.gz',
+            'rows': len(rows),
+            'created_at': timezone.now().isoformat(),
+            'diff': None,
+        }
+        data = build_sqlite(rows)
+        self._write(entry['file'], data)
+        entry['size'] = len(data)
+
+        if previous:
+            diff = build_diff(self.read_rows(previous), rows, previous, entry)
+            entry['diff'] = f'foods-{previous["hash"][:16]}-{digest[:16]}.json.gz'
+            self._write(entry['diff'], diff)
+            entry['diff_size'] = len(diff)
+
+        manifest['snapshots'] = (manifest['snapshots'] + [entry])[-self.keep:]
+        self._write('manifest.json', json.dumps(manifest).encode())
+        self._prune(manifest)
+        return entry
+
+    def read_rows(self, entry):
+        """The rows of a published snapshot, ordered by id."""
+        with gzip.open(self.path(entry['file'])) as compressed, tempfile.NamedTemporaryFile(suffix='.sqlite') as file:
+            file.write(compressed.read())
+            file.flush()
+            connection = sqlite3.connect(file.name)
+            try:
+                return connection.execute(f'SELECT {", ".join(COLUMNS)} FROM foods ORDER BY id').fetchall()
+            finally:
+                connection.close()
+
+    def _prune(self, manifest):
+        keep = self.files()
+        for name in os.listdir(self.directory):
+            if name.startswith('foods-') and name not in keep:
+                os.remove(self.path(name))
+
+    def chain(self, digest):
+        """The entries after snapshot digest, whose diffs bring it up to date; None if it is unknown."""
+        snapshots = self.manifest()['snapshots']
+        for index, entry in enumerate(snapshots):
+            if entry['hash'] == digest:
+                return snapshots[index + 1:]
+        return None
+
+
+def content_hash(rows):
+    """SHA-256 over the column names and rows, independent of the file format."""
+    digest = hashlib.sha256(json.dumps(COLUMNS).encode())
+    for row in rows:
+        digest.update(json.dumps(row, separators=(',', ':')).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def build_sqlite(rows):
+    """A gzipped SQLite database holding rows in a foods table."""
+    columns = [
+        f'{field.attname} {SQLITE_TYPES.get(field.get_internal_type(), "TEXT")}'
+        + (' PRIMARY KEY' if field.primary_key else '')
+        for field in FoodItem._meta.concrete_fields if field.attname in COLUMNS
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'foods.sqlite')
+        connection = sqlite3.connect(path)
+        try:
+            connection.execute(f'CREATE TABLE foods ({", ".join(columns)})')
+            connection.executemany(
+                f'INSERT INTO foods VALUES ({", ".join("?" * len(COLUMNS))})', rows
+            )
+            # Offline search is by name
+            connection.execute('CREATE INDEX foods_name ON foods (food_name COLLATE NOCASE)')
+            connection.commit()
+            connection.execute('VACUUM')
+        finally:
+            connection.close()
+        with open(path, 'rb') as file:
+            # mtime=0 keeps the bytes identical for identical content
+            return gzip.compress(file.read(), compresslevel=9, mtime=0)
+
+
+def build_diff(old_rows, new_rows, old_entry, new_entry):
+    """Gzipped JSON with the rows to upsert and the ids to delete to go from old_entry to new_entry."""
+    old = {row[0]: tuple(row) for row in old_rows}
+    new = {row[0]: tuple(row) for row in new_rows}
+    diff = {
+        'format': SNAPSHOT_FORMAT,
+        'from': {'version': old_entry['version'], 'hash': old_entry['hash']},
+        'to': {'version': new_entry['version'], 'hash': new_entry['hash']},
+        'columns': COLUMNS,
+        'upserts': [list(row) for pk, row in new.items() if old.get(pk) != row],
+        'deleted': sorted(old.keys() - new.keys()),
+    }
+    return gzip.compress(json.dumps(diff, separators=(',', ':')).encode(), mtime=0)
+
+
+snapshot_store = SnapshotStore()
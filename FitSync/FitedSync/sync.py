@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CustWorkout, CustWorkoutLog, ExerciseLog, MealLog, Tombstone, UserDailyLog, WorkoutLog
+from .serializers import (
+    CustWorkoutLogSerializer, CustWorkoutSerializer, ExerciseLogSerializer, MealLogSerializer,
+    UserDailyLogSerializer, WorkoutLogSerializer,
+)
+
+TOKEN_VERSION = 1
+
+# response key -> (model, serializer, select_related, prefetch_related)
+SYNCED = {
+    'meal_logs': (MealLog, MealLogSerializer, ['food_item'], []),
+    'exercise_logs': (ExerciseLog, ExerciseLogSerializer, [], []),
+    'workout_logs': (WorkoutLog, WorkoutLogSerializer, [], []),
+    'cust_workout_logs': (CustWorkoutLog, CustWorkoutLogSerializer, [], []),
+    'cust_workouts': (CustWorkout, CustWorkoutSerializer, [], ['workout_exercises']),
+    'daily_logs': (UserDailyLog, UserDailyLogSerializer, [], []),
+}
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def encode_token(moment):
+    micros = int(moment.timestamp() * 1_000_000)
+    raw = json.dumps([TOKEN_VERSION, micros], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        version, micros = json.loads(raw)
+        if version != TOKEN_VERSION or not isinstance(micros, int):
+            raise ValueError
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, TypeError, OverflowError, OSError) as exc:
+        raise InvalidSyncToken('Invalid sync token.') from exc
+
+
+def changes_since(user, token=None):
+    """
+    Rows of the user's synced tables created, updated or deleted since token.
+
+    The returned token is taken before reading, and the next read starts
+    SYNC_OVERLAP_SECONDS earlier, so a row committed by a transaction that
+    was still open during this read is picked up next time. Clients may see
+    a row twice and must apply changes idempotently (upsert by id). With no
+    token, or one older than the tombstone retention, everything is sent
+    with reset=True and the client should replace its copy.
+    """
+    now = timezone.now()
+    since = decode_token(token) if token else None
+    retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    reset = since is None or since < now - retention
+    if not reset:
+        since -= timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 30))
+
+    changes, deleted = {}, {}
+    for key, (model, serializer_class, select, prefetch) in SYNCED.items():
+        queryset = model.objects.filter(user=user).select_related(*select).prefetch_related(*prefetch)
+        if not reset:
+            queryset = queryset.filter(updated_at__gt=since)
+        changes[key] = serializer_class(queryset.order_by('updated_at', 'pk'), many=True).data
+        deleted[key] = []
+
+    if not reset:
+        keys = {model._meta.model_name: key for key, (model, *_) in SYNCED.items()}
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gt=since).values_list('model', 'object_id')
+        for model_name, object_id in tombstones.distinct():
+            if model_name in keys:
+                deleted[keys[model_name]].append(object_id)
+
+    return {'token': encode_token(now), 'reset': reset, 'changes': changes, 'deleted': deleted}
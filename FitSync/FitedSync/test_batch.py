@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.db import connection
+
+from .models import Meal, WorkoutLog
+from .testing import APITestCase, create_food
+
+
+def workout(routine_name, duration_minutes=30, date="2024-01-01"):
+    return {'date': date, 'routine_name': routine_name, 'duration_minutes': duration_minutes, 'calories_burned': 300}
+
+
+class TestBatch(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.food = create_food('Oats', caloric_value=380, protein=13)
+        self.kept = WorkoutLog.objects.create(user=self.user, **workout("Kept"))
+        self.gone = WorkoutLog.objects.create(user=self.user, **workout("Gone"))
+
+    def batch(self, operations):
+        return self.client.post("/api/batch/", {'operations': operations}, format='json')
+
+    def assert_created_rows_match(self, results):
+        for result in results:
+            row = WorkoutLog.objects.get(pk=result['data']['id'])
+            self.assertEqual((row.routine_name, row.duration_minutes), (result['data']['routine_name'], result['data']['duration_minutes']))
+
+    def test_mixed_operations(self):
+        """Test creates, an update, a delete and a meal apply in one request, one result each."""
+        response = self.batch([
+            {'method': 'create', 'resource': 'workout-logs', 'data': workout("Run")},
+            {'method': 'create', 'resource': 'workout-logs', 'data': workout("Swim")},
+            {'method': 'update', 'resource': 'workout-logs', 'id': self.kept.pk, 'data': {'duration_minutes': 45}},
+            {'method': 'delete', 'resource': 'workout-logs', 'id': self.gone.pk},
+            {'method': 'create', 'resource': 'meals', 'data': {
+                'date': "2024-01-01", 'meal_type': 'breakfast', 'food_items': [{'food_item': self.food.pk, 'quantity': 50}],
+            }},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], [201, 201, 200, 204, 201])
+        self.assertEqual(
+            sorted(WorkoutLog.objects.filter(user=self.user).values_list('routine_name', 'duration_minutes')),
+            [("Kept", 45), ("Run", 30), ("Swim", 30)],
+        )
+        self.assert_created_rows_match(results[:2])
+        self.assertEqual(results[4]['data']['totals']['total_calories'], 190)
+
+    def test_failure_rolls_back_everything(self):
+        """Test an invalid operation undoes the ones before it and reports its index."""
+        response = self.batch([
+            {'method': 'create', 'resource': 'workout-logs', 'data': workout("Run")},
+            {'method': 'delete', 'resource': 'workout-logs', 'id': self.gone.pk},
+            {'method': 'create', 'resource': 'workout-logs', 'data': {'routine_name': "No date"}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error']['index'], 2)
+        self.assertEqual(
+            sorted(WorkoutLog.objects.filter(user=self.user).values_list('routine_name', flat=True)), ["Gone", "Kept"]
+        )
+
+    def test_created_rows_come_back_with_ids(self):
+        """Test bulk created rows get their own ids, also on backends without INSERT ... RETURNING."""
+        operations = [
+            {'method': 'create', 'resource': 'workout-logs', 'data': workout("Run", 20)},
+            {'method': 'create', 'resource': 'workout-logs', 'data': workout("Run", 20)},
+            {'method': 'create', 'resource': 'workout-logs', 'data': workout("Swim", 40)},
+            {'method': 'create', 'resource': 'meals', 'data': {
+                'date': "2024-01-02", 'meal_type': 'lunch',
+                'food_items': [{'food_item': self.food.pk, 'quantity': 50}, {'food_item': self.food.pk, 'quantity': 80}],
+            }},
+        ]
+        for returning in (True, False):
+            with self.subTest(returning=returning), mock.patch.object(
+                type(connection.features), 'can_return_rows_from_bulk_insert', returning
+            ):
+                results = self.batch(operations).json()['results']
+                ids = [result['data']['id'] for result in results[:3]]
+                self.assertEqual(len(set(ids)), 3)
+                self.assertNotIn(None, ids)
+                self.assert_created_rows_match(results[:3])
+
+                meal = Meal.objects.get(pk=results[3]['data']['id'])
+                self.assertEqual(sorted(meal.meal_logs.values_list('quantity', flat=True)), [50, 80])
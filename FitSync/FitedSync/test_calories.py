@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase, override_settings
+
+from .calories import burn
+from .models import Exercise, ExerciseLog
+from .testing import APITestCase
+
+
+@override_settings(CALORIE_DEFAULT_WEIGHT_KG=70)
+class TestBurn(SimpleTestCase):
+    def test_met_times_weight_times_duration(self):
+        """Test kcal = MET * 3.5 / 200 * kg * minutes."""
+        self.assertEqual(burn(8.0, 70, 30), 294.0)
+        self.assertEqual(burn(3.8, 80, 45), 239.4)
+
+    def test_rows_and_shared_values(self):
+        """Test lists give one value per row, single values are shared and missing weights use the default."""
+        self.assertEqual(burn([8.0, 5.0], [70, None], 30), [294.0, 183.8])
+        self.assertEqual(burn(5.0, 70, [30, 60]), [183.8, 367.5])
+
+
+class TestExerciseLogCalories(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # Barbell work is MET 6.0
+        self.exercise = Exercise.objects.create(
+            title="Deadlift", description="", muscle_group="Back", equipment="Barbell", image_url="https://example.com/image.jpg"
+        )
+
+    def log(self, **data):
+        return {'exercise': self.exercise.pk, 'date': "2024-01-01", 'duration_minutes': 40, **data}
+
+    def test_estimated_when_left_out(self):
+        """Test a log without calories_burned gets the MET estimate for the user's weight."""
+        response = self.client.post("/api/exercise-logs/", self.log(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ExerciseLog.objects.get(pk=response.json()['id']).calories_burned, 294)
+
+    def test_client_value_is_kept(self):
+        """Test calories_burned sent by the client is stored as is."""
+        response = self.client.post("/api/exercise-logs/", self.log(calories_burned=123), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ExerciseLog.objects.get(pk=response.json()['id']).calories_burned, 123)
+
+    def test_batch_creates(self):
+        """Test batch creates estimate only the logs that leave calories_burned out."""
+        response = self.client.post("/api/batch/", {'operations': [
+            {'method': 'create', 'resource': 'exercise-logs', 'data': self.log()},
+            {'method': 'create', 'resource': 'exercise-logs', 'data': self.log(calories_burned=123)},
+        ]}, format='json')
+        self.assertEqual([result['data']['calories_burned'] for result in response.json()['results']], [294, 123])
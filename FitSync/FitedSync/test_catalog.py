@@ -0,0 +1,42 @@
+from .testing import APITestCase, create_food, create_user
+
+
+class TestFoodItemAdmin(APITestCase):
+    def test_change_page_loads(self):
+        """Test the admin change page of a food renders."""
+        admin = create_user('admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        food = create_food('Cream cheese')
+        response = self.client.get(f"/admin/FitedSync/fooditem/{food.pk}/change/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Cream cheese')
+
+
+class TestCatalogConditionalRequests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.food = create_food('Cream cheese', caloric_value=340)
+
+    def test_matching_etag_is_not_modified(self):
+        """Test a GET with the current ETag in If-None-Match gets a bodyless 304."""
+        response = self.client.get(f"/api/foods/{self.food.pk}/")
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(f"/api/foods/{self.food.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_food_save_changes_the_etag(self):
+        """Test saving a food moves the catalog ETag, so the old one gets the new row."""
+        etag = self.client.get(f"/api/foods/{self.food.pk}/")['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.caloric_value = 350
+            self.food.save()
+
+        response = self.client.get(f"/api/foods/{self.food.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['caloric_value'], 350)
@@ -0,0 +1,43 @@
+from .testing import APITestCase, create_food
+
+
+class TestFoodQuery(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.chicken = create_food('Chicken breast', caloric_value=165, protein=31)
+        self.tofu = create_food('Tofu', caloric_value=76, protein=8)
+        self.cheese = create_food('Parmesan cheese', caloric_value=431, protein=38)
+        self.rice = create_food('Rice', caloric_value=130, protein=2.7)
+
+    def ids(self, params):
+        response = self.client.get("/api/foods/", params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_range_filters(self):
+        """Test comparisons on nutrient columns, MealLog names included, combine."""
+        self.assertEqual(self.ids({'protein__gte': 8, 'ordering': 'id'}), [self.chicken.pk, self.tofu.pk, self.cheese.pk])
+        self.assertEqual(self.ids({'protein__gt': 8, 'calories__lte': 200}), [self.chicken.pk])
+        self.assertEqual(self.ids({'caloric_value__lt': 100, 'protein__lt': 5}), [])
+
+    def test_ordering_and_database_filters(self):
+        """Test sorting by a nutrient and a text lookup left to the database."""
+        self.assertEqual(self.ids({'ordering': '-protein', 'limit': 2}), [self.cheese.pk, self.chicken.pk])
+        self.assertEqual(self.ids({'food_name__icontains': 'cheese', 'protein__gte': 30}), [self.cheese.pk])
+
+    def test_other_parameters_are_ignored(self):
+        """Test parameters that name no FoodItem column, relations included, leave the plain list."""
+        plain = self.client.get("/api/foods/").json()
+        for params in ({'page': 2}, {'_': 1700000000}, {'meallog__in': 1}, {'meallog__user': self.user.pk}):
+            with self.subTest(params=params):
+                response = self.client.get("/api/foods/", params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), plain)
+        # Ignored next to real filters too
+        self.assertEqual(self.ids({'protein__gte': 35, 'page': 2}), [self.cheese.pk])
+
+    def test_unusable_filters(self):
+        """Test a bad value or an unsupported lookup on a real column is a 400."""
+        for params in ({'protein__gte': 'lots'}, {'food_name__regex': '^R'}, {'ordering': 'meallog'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/foods/", params).status_code, 400)
@@ -0,0 +1,32 @@
+from django.test import override_settings
+
+from .testing import APITestCase, create_user
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1', '10.0.0.0/8'])
+class TestMetricsAccess(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.logout()
+
+    def test_allowed_addresses(self):
+        """Test the scraper's addresses, single or by network, get the metrics without logging in."""
+        for address in ('127.0.0.1', '10.1.2.3'):
+            with self.subTest(address=address):
+                response = self.client.get("/metrics", REMOTE_ADDR=address)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b'fitsync_http_requests_total', response.content)
+
+    def test_other_addresses_are_forbidden(self):
+        """Test anyone else, a logged in non-staff user or a spoofed X-Forwarded-For included, gets a 403."""
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR='203.0.113.5').status_code, 403)
+        self.assertEqual(
+            self.client.get("/metrics", REMOTE_ADDR='203.0.113.5', HTTP_X_FORWARDED_FOR='127.0.0.1').status_code, 403
+        )
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR='203.0.113.5').status_code, 403)
+
+    def test_staff_from_anywhere(self):
+        """Test staff users can read the metrics from any address."""
+        self.client.force_login(create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR='203.0.113.5').status_code, 200)
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import MealLog
+from .nutrients import nutrient_matrix
+from .testing import APITestCase, create_food
+
+
+class TestNutrientMatrixCache(APITestCase):
+    def test_repeated_catalog_version_does_not_reuse_the_cached_matrix(self):
+        """Test a catalog version number seen again after a rollback doesn't serve the old matrix file."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            create_food(caloric_value=50)
+            cache.clear()
+            nutrient_matrix.arrays()
+            raise RuntimeError
+
+        # A new process: nothing in memory and no cached version stamp
+        nutrient_matrix.invalidate()
+        cache.clear()
+        food = create_food(caloric_value=700)
+        meal_log = MealLog.objects.create(
+            user=self.user, date="2024-01-01", meal_type="lunch", food_item=food, quantity=100, food_name="Test food"
+        )
+        self.assertEqual(meal_log.calories, 700)
+
+
+class TestSimilarFoods(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.chicken = create_food('Chicken breast', caloric_value=165, protein=31, fat=3.6)
+        self.turkey = create_food('Turkey breast', caloric_value=147, protein=30, fat=2)
+        self.tuna = create_food('Tuna', caloric_value=132, protein=28, fat=1)
+        self.rice = create_food('Rice', caloric_value=130, carbohydrates=28, protein=2.7)
+        self.butter = create_food('Butter', caloric_value=717, fat=81, protein=0.9)
+
+    def similar(self, food, **params):
+        response = self.client.get(f"/api/foods/{food.pk}/similar/", params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()]
+
+    def test_nearest_food_comes_first(self):
+        """Test the closest nutrient profile is the first suggestion and the food itself is left out."""
+        ids = self.similar(self.chicken)
+        self.assertEqual(ids[0], self.turkey.pk)
+        self.assertNotIn(self.chicken.pk, ids)
+        self.assertEqual(len(ids), 4)
+
+    def test_constraints(self):
+        """Test less/more narrow the suggestions down."""
+        self.assertEqual(self.similar(self.chicken, less='fat', more='protein'), [])
+        self.assertEqual(self.similar(self.chicken, less='calories'), [self.turkey.pk, self.tuna.pk, self.rice.pk])
+
+    def test_deleted_food_is_not_suggested(self):
+        """Test a food deleted after the matrix was loaded is replaced, not returned or dropped."""
+        self.assertEqual(self.similar(self.chicken, limit=2), [self.turkey.pk, self.tuna.pk])
+        # No commit in a test, so the cached catalog stamp and the loaded matrix still list it
+        self.turkey.delete()
+        ids = self.similar(self.chicken, limit=2)
+        self.assertEqual(len(ids), 2)
+        self.assertNotIn(self.turkey.pk, ids)
+        self.assertEqual(ids[0], self.tuna.pk)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from .models import DailyCalorieRollup, Exercise, ExerciseLog, MealLog, WorkoutLog
+from .rollups import refresh_daily_rollup
+from .signals import batched_log_updates
+from .testing import APITestCase, create_food
+
+DAY, NEXT_DAY = "2024-01-01", "2024-01-02"
+
+
+class TestDailyCalorieRollups(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.food = create_food('Rice', caloric_value=130)
+        self.exercise = Exercise.objects.create(
+            title="Rowing", description="", muscle_group="Back", equipment="Machine", image_url="https://example.com/image.jpg"
+        )
+
+    def rollup(self, date=DAY):
+        return DailyCalorieRollup.objects.filter(user=self.user, date=date).values(
+            'calories_consumed', 'calories_burned_exercise', 'calories_burned_workout'
+        ).first()
+
+    def meal_log(self, quantity, date=DAY):
+        return MealLog.objects.create(
+            user=self.user, date=date, meal_type="lunch", food_item=self.food, quantity=quantity, food_name="Rice"
+        )
+
+    def test_meal_logs(self):
+        """Test creating, updating and deleting meal logs keeps calories_consumed current."""
+        first = self.meal_log(100)
+        self.meal_log(200)
+        self.assertEqual(self.rollup()['calories_consumed'], 390)
+
+        first.quantity = 50
+        first.save()
+        self.assertEqual(self.rollup()['calories_consumed'], 325)
+
+        first.delete()
+        self.assertEqual(self.rollup()['calories_consumed'], 260)
+
+    def test_exercise_and_workout_logs(self):
+        """Test exercise and workout logs feed their own rollup columns."""
+        exercise_log = ExerciseLog.objects.create(
+            user=self.user, exercise=self.exercise, date=DAY, duration_minutes=30, calories_burned=250
+        )
+        workout_log = WorkoutLog.objects.create(
+            user=self.user, date=DAY, routine_name="Legs", duration_minutes=45, calories_burned=400
+        )
+        self.assertEqual(self.rollup(), {
+            'calories_consumed': 0, 'calories_burned_exercise': 250, 'calories_burned_workout': 400,
+        })
+
+        exercise_log.calories_burned = 300
+        exercise_log.save()
+        workout_log.delete()
+        self.assertEqual(self.rollup(), {
+            'calories_consumed': 0, 'calories_burned_exercise': 300, 'calories_burned_workout': 0,
+        })
+
+    def test_moving_a_log_refreshes_both_days(self):
+        """Test changing a log's date takes its calories off the old day and onto the new one."""
+        self.meal_log(100)
+        moved = self.meal_log(200)
+        moved.date = NEXT_DAY
+        moved.save()
+        self.assertEqual(self.rollup(DAY)['calories_consumed'], 130)
+        self.assertEqual(self.rollup(NEXT_DAY)['calories_consumed'], 260)
+
+    def test_batched_updates_refresh_once_on_exit(self):
+        """Test logs written inside batched_log_updates refresh each day once, when the block ends."""
+        with mock.patch('FitedSync.signals.refresh_daily_rollup', wraps=refresh_daily_rollup) as refresh:
+            with batched_log_updates():
+                for quantity in (100, 200, 300):
+                    self.meal_log(quantity)
+                self.meal_log(100, date=NEXT_DAY)
+                refresh.assert_not_called()
+                self.assertIsNone(self.rollup())
+            self.assertEqual(sorted(str(call.args[2]) for call in refresh.call_args_list), [DAY, NEXT_DAY])
+        self.assertEqual(self.rollup(DAY)['calories_consumed'], 780)
+        self.assertEqual(self.rollup(NEXT_DAY)['calories_consumed'], 130)
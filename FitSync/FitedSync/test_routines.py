@@ -0,0 +1,57 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import Exercise, WorkoutExercise, WorkoutRoutine
+from .testing import APITestCase
+
+
+class TestWorkoutRoutineQueries(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.exercises = [
+            Exercise.objects.create(title=f"Exercise {i}", description="", muscle_group="Chest",
+                                    equipment="Dumbbell", image_url="https://example.com/image.jpg")
+            for i in range(3)
+        ]
+
+    def create_routines(self, count):
+        for i in range(count):
+            routine = WorkoutRoutine.objects.create(
+                routine_id=f"T{WorkoutRoutine.objects.count():03d}", name=f"Routine {i}", description="",
+                duration=30, difficulty_level="Beginner", workout_type="HIIT", sets=3, repetitions="10",
+                exercises="", target_muscle_groups="Full Body",
+            )
+            routine.exercise.set(self.exercises)
+            for exercise in self.exercises:
+                WorkoutExercise.objects.create(workout=routine, exercise=exercise, sets=3, reps=10)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing routines costs the same number of queries for 1 or 20 routines."""
+        # Caches the catalog version stamp, which both measured requests would otherwise differ on
+        self.client.get("/api/workout-routines/")
+        self.create_routines(1)
+        with CaptureQueriesContext(connection) as single:
+            response = self.client.get("/api/workout-routines/")
+        self.assertEqual(response.status_code, 200)
+
+        self.create_routines(19)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get("/api/workout-routines/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 20)
+        self.assertEqual(len(single), len(many))
+        # Row versions, then the changed rows and their two prefetches
+        self.assertLessEqual(len(many), 4)
+
+        # Unchanged rows come from the fragment cache
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get("/api/workout-routines/")
+        self.assertEqual(len(cached), 1)
+
+    def test_list_calories_match_single_routine(self):
+        """Test the batched calorie computation matches calculate_calories."""
+        self.create_routines(2)
+        response = self.client.get("/api/workout-routines/")
+        for routine_data in response.json():
+            routine = WorkoutRoutine.objects.get(pk=routine_data["id"])
+            self.assertAlmostEqual(routine_data["calories_burned"], routine.calculate_calories(70, routine.duration))
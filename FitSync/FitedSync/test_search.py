@@ -0,0 +1,39 @@
+from .models import Exercise
+from .testing import APITestCase, create_food
+
+
+class TestCatalogSearchFreshness(APITestCase):
+    def food_search(self, query):
+        return [hit['food_name'] for hit in self.client.get("/api/foods/search/", {'q': query}).json()]
+
+    def test_edited_food_is_searchable(self):
+        """Test a renamed food is found under its new name, by search and resolve, without a restart."""
+        food = create_food('Cottage cheese')
+        create_food('Cheddar cheese')
+        self.assertEqual(self.food_search('cottage'), ['Cottage cheese'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            food.food_name = 'Quark'
+            food.save()
+        self.assertEqual(self.food_search('quark'), ['Quark'])
+        self.assertEqual(self.food_search('cottage'), [])
+        response = self.client.get("/api/foods/resolve/", {'name': 'quark'})
+        self.assertEqual(response.json()[0]['match']['food_item'], food.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            food.delete()
+        self.assertEqual(self.food_search('quark'), [])
+        self.assertEqual(self.food_search('cheese'), ['Cheddar cheese'])
+
+    def test_edited_exercise_is_searchable(self):
+        """Test a renamed exercise is found under its new name without a restart."""
+        exercise = Exercise.objects.create(
+            title="Bench press", description="", muscle_group="Chest", equipment="Barbell", image_url="https://example.com/image.jpg"
+        )
+        self.assertEqual(self.client.get("/api/exercises/search/", {'q': 'bench'}).json()['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise.title = "Floor press"
+            exercise.save()
+        results = self.client.get("/api/exercises/search/", {'q': 'floor'}).json()['results']
+        self.assertEqual([hit['title'] for hit in results], ["Floor press"])
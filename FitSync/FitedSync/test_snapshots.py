@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+
+from django.test import override_settings
+
+from .models import FoodItem
+from .snapshots import COLUMNS, content_hash, snapshot_store
+from .testing import APITestCase, create_food
+
+
+class TestFoodSnapshots(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        snapshot_dir = override_settings(FOOD_SNAPSHOT_DIR=os.path.join(directory.name, 'snapshots'))
+        snapshot_dir.enable()
+        self.addCleanup(snapshot_dir.disable)
+        self.database = os.path.join(directory.name, 'client.sqlite')
+
+        self.oats = create_food('Oats', caloric_value=389, protein=16.9)
+        self.milk = create_food('Milk', caloric_value=42, protein=3.4)
+        self.honey = create_food('Honey', caloric_value=304, carbohydrates=82)
+
+    def download(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = b''.join(response.streaming_content)
+        response.close()
+        return gzip.decompress(data)
+
+    def catalog_rows(self):
+        return [tuple(row) for row in FoodItem.objects.order_by('pk').values_list(*COLUMNS)]
+
+    def client_rows(self, connection):
+        return connection.execute(f'SELECT {", ".join(COLUMNS)} FROM foods ORDER BY id').fetchall()
+
+    def test_snapshot_and_diffs_round_trip(self):
+        """Test a client restoring the first snapshot and applying the diffs ends up with the catalog's rows."""
+        first = snapshot_store.publish()
+        self.assertIsNotNone(first)
+        data = self.client.get("/api/foods/snapshot/").json()
+        self.assertEqual(data['hash'], first['hash'])
+        with open(self.database, 'wb') as file:
+            file.write(self.download(data['url']))
+        connection = sqlite3.connect(self.database)
+        self.addCleanup(connection.close)
+        self.assertEqual(self.client_rows(connection), self.catalog_rows())
+
+        # Committed, so the new catalog version is visible to publish()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oats.protein = 13
+            self.oats.save()
+            self.milk.delete()
+            create_food('Almonds', caloric_value=579, fat=50)
+        latest = snapshot_store.publish()
+        self.assertEqual(latest['version'], 2)
+
+        data = self.client.get("/api/foods/snapshot/", {'since': first['hash']}).json()
+        self.assertEqual(data['hash'], latest['hash'])
+        self.assertEqual(len(data['diffs']), 1)
+        for diff_entry in data['diffs']:
+            diff = json.loads(self.download(diff_entry['url']))
+            self.assertEqual(diff['columns'], COLUMNS)
+            connection.executemany(
+                f'INSERT OR REPLACE INTO foods VALUES ({", ".join("?" * len(COLUMNS))})', diff['upserts']
+            )
+            connection.executemany('DELETE FROM foods WHERE id = ?', [(pk,) for pk in diff['deleted']])
+
+        rows = self.client_rows(connection)
+        self.assertEqual(rows, self.catalog_rows())
+        self.assertEqual(content_hash(rows), latest['hash'])
+
+    def test_unchanged_catalog_publishes_nothing(self):
+        """Test publishing again without a catalog change writes no new snapshot."""
+        snapshot_store.publish()
+        self.assertIsNone(snapshot_store.publish())
+        self.assertEqual(len(snapshot_store.manifest()['snapshots']), 1)
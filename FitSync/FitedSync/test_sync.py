@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from .models import Tombstone, WorkoutLog
+from .testing import APITestCase, create_user
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class TestDeltaSync(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = self.create_log("Old run")
+
+    def create_log(self, routine_name, user=None):
+        return WorkoutLog.objects.create(
+            user=user or self.user, date="2024-01-01", routine_name=routine_name, duration_minutes=30, calories_burned=300
+        )
+
+    def sync(self, token=None):
+        response = self.client.get("/api/sync/", {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def cursor(self):
+        """A sync token taken after every row so far was written."""
+        WorkoutLog.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(hours=1))
+        return self.sync()['token']
+
+    def test_first_sync_sends_everything(self):
+        """Test a sync without a token is a reset with all of the user's rows."""
+        self.create_log("Other user's run", user=create_user('other'))
+        data = self.sync()
+        self.assertTrue(data['reset'])
+        self.assertEqual([row['id'] for row in data['changes']['workout_logs']], [self.old.pk])
+
+    def test_changes_since_cursor(self):
+        """Test only rows created or updated after the cursor come back."""
+        token = self.cursor()
+        new = self.create_log("New run")
+        data = self.sync(token)
+        self.assertFalse(data['reset'])
+        self.assertEqual([row['id'] for row in data['changes']['workout_logs']], [new.pk])
+
+        token = self.cursor()
+        self.old.duration_minutes = 45
+        self.old.save()
+        data = self.sync(token)
+        self.assertEqual([(row['id'], row['duration_minutes']) for row in data['changes']['workout_logs']], [(self.old.pk, 45)])
+
+    def test_deletions_come_back_as_tombstones(self):
+        """Test a row deleted after the cursor is listed under deleted, not changes."""
+        token = self.cursor()
+        old_id = self.old.pk
+        self.old.delete()
+        data = self.sync(token)
+        self.assertEqual(data['deleted']['workout_logs'], [old_id])
+        self.assertEqual(data['changes']['workout_logs'], [])
+
+    def test_cursor_at_latest_change_returns_nothing(self):
+        """Test syncing again with the newest token finds no changes or deletions."""
+        self.create_log("Another run").delete()
+        data = self.sync(self.cursor())
+        self.assertFalse(data['reset'])
+        self.assertFalse(any(data['changes'].values()))
+        self.assertFalse(any(data['deleted'].values()))
+
+    def test_invalid_token(self):
+        """Test a malformed token is a 400."""
+        response = self.client.get("/api/sync/", {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,47 @@
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import CustomUser, FoodItem
+from .nutrients import NUTRIENTS, nutrient_matrix
+from .search import exercise_index, food_index, food_resolver
+
+
+def create_user(username, **fields):
+    fields.setdefault('weight', 70)
+    return CustomUser.objects.create_user(
+        username=username, email=f'{username}@example.com', password='test', **fields
+    )
+
+
+def create_food(food_name='Test food', **values):
+    """A FoodItem with every nutrient zero unless given."""
+    required = {field: 0 for field in NUTRIENTS if not FoodItem._meta.get_field(field).null}
+    return FoodItem.objects.create(food_name=food_name, **{**required, **values})
+
+
+class APITestCase(TestCase):
+    """
+    A TestCase with an authenticated API client and empty in-process
+    catalogs. Test transactions roll back, so catalog version numbers repeat
+    between tests; the indexes, the nutrient matrix cache directory and the
+    caches start over for every test.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache_dir = override_settings(NUTRIENT_CACHE_DIR=directory.name)
+        cache_dir.enable()
+        self.addCleanup(cache_dir.disable)
+        for index in (nutrient_matrix, food_index, food_resolver, exercise_index):
+            index.invalidate()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+        self.user = create_user('tester')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
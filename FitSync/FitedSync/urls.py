@@ -1,9 +1,16 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import UserRegistrationView
+from .views import UserRegistrationView, CacheStatsView, SyncView, BatchView, NutritionReportView, MealPlanView
+from .metrics import metrics_view
 
 urlpatterns = [
     path('api/auth/register/', UserRegistrationView.as_view(), name='register'),
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('api/batch/', BatchView.as_view(), name='batch'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
+    path('api/nutrition-report/', NutritionReportView.as_view(), name='nutrition-report'),
+    path('api/meal-plan/', MealPlanView.as_view(), name='meal-plan'),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
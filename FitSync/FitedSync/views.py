@@ -3,19 +3,108 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db.models import Sum
 from datetime import datetime, timedelta
-from .models import CustomUser, Exercise, WorkoutRoutine, FoodItem, UserDailyLog, MealLog, ExerciseLog, CustWorkout, Meal
+from .models import CustomUser, Exercise, WorkoutRoutine, WorkoutExercise, FoodItem, UserDailyLog, MealLog, ExerciseLog, CustWorkout, Meal, DailyCalorieRollup
 from .serializers import *
 from rest_framework import generics
 from rest_framework.views import APIView
 from django.core.exceptions import ObjectDoesNotExist
 from django.shortcuts import get_object_or_404
-from django.db.models import Prefetch
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
+from .search import exercise_index, food_index, food_resolver
+from .services import MealIngestError, ingest_meal
+from .pagination import DateKeysetPagination, FoodQueryPagination
+from .cache import DashboardCache, dashboard_cache
+from .fragments import exercise_fragments, food_fragments, routine_fragments
+from .catalog import EXERCISES, FOODS, ROUTINES, catalog_versions, conditional_catalog_response
+from .renderers import FastJSONRenderer, RawJSON, encode_json
+from .sync import InvalidSyncToken, changes_since
+from .batch import BatchError, run_batch
+from .fieldsets import SparseFieldsetViewMixin, is_compact, to_columns, wants_sparse
+from .foodquery import has_food_query, in_order, query_food_ids
+from .snapshots import snapshot_store
+from .nutrients import COLUMN, MEAL_LOG_FIELDS, UnknownFood, nutrient_matrix, nutrition_report, similar_foods
+from .mealplan import MealPlanError, meal_planner
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 import logging
 
 logger = logging.getLogger(__name__)        
 
+def get_int_param(request, name, default=None):
+    """Read a positive integer query parameter, falling back to default."""
+    try:
+        value = int(request.query_params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+def get_list_param(request, name):
+    """Read a query parameter given repeatedly and/or comma separated."""
+    values = []
+    for value in request.query_params.getlist(name):
+        values.extend(part.strip() for part in value.split(',') if part.strip())
+    return values
+
+class LogHistoryMixin:
+    """
+    Adds a `history` action listing the user's raw log rows, newest first,
+    with keyset pagination and optional start_date/end_date bounds.
+    """
+    pagination_class = DateKeysetPagination
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        queryset = self.filter_queryset(self.get_serializer_class().Meta.model.objects.filter(user=request.user))
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class CatalogFragmentMixin:
+    """
+    Serves list and retrieve from the rows' precomputed JSON fragments
+    (FitedSync.fragments) when the response is rendered as JSON, with
+    ETag / Last-Modified validation against the catalog's version stamp.
+    """
+    fragments = None
+    catalog = None
+
+    def uses_fragments(self, request):
+        # Sparse fieldsets and compact lists are built from the query instead
+        return isinstance(request.accepted_renderer, FastJSONRenderer) and not wants_sparse(request)
+
+    def list(self, request, *args, **kwargs):
+        return conditional_catalog_response(request, self.catalog, lambda: self.list_response(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_catalog_response(request, self.catalog, lambda: self.retrieve_response(request, *args, **kwargs))
+
+    def list_response(self, request, *args, **kwargs):
+        if not self.uses_fragments(request):
+            return super().list(request, *args, **kwargs)
+        return Response(self.fragments.render_list(self.filter_queryset(self.get_queryset())))
+
+    def retrieve_response(self, request, *args, **kwargs):
+        if not self.uses_fragments(request):
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            data = self.fragments.render_one(self.get_queryset(), kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except (TypeError, ValueError):
+            data = None
+        if data is None:
+            raise Http404
+        return Response(data)
+
 class UserRegistrationView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
@@ -35,56 +124,95 @@ class UserRegistrationView(generics.CreateAPIView):
         print("Serializer validated data:", serializer.validated_data)
         serializer.save()
 
-class CalorieDataViewSet(viewsets.ModelViewSet):
+class CacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Hit/miss counters for this worker process
+        return Response({'dashboard': dashboard_cache.stats()})
+
+class SyncView(APIView):
     permission_classes = [IsAuthenticated]
-    serializer_class = CalorieDataSerializer
 
     def get(self, request):
-        user_id = self.request.query_params.get('userId')
+        # Everything changed since ?since=<token>; see FitedSync.sync.changes_since
+        try:
+            return Response(changes_since(request.user, request.query_params.get('since')))
+        except InvalidSyncToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Aggregate data for Meal Logs
-        meal_logs = (
-            MealLog.objects.filter(user_id=user_id)
-            .values('date')
-            .annotate(consumed=Sum('calories'))
-        )
+class BatchView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        # Aggregate data for Exercise Logs
-        exercise_logs = (
-            ExerciseLog.objects.filter(user_id=user_id)
-            .values('date')
-            .annotate(burned=Sum('calories_burned'))
-        )
+    def post(self, request):
+        # Many log operations, one request and one transaction; see FitedSync.batch.run_batch
+        try:
+            operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+            results = run_batch(request, operations)
+        except BatchError as e:
+            return Response({'error': e.as_data()}, status=e.status_code)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+class NutritionReportView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        workout_logs = (
-            WorkoutLog.objects.filter(user_id=user_id)
-            .values('date')
-            .annotate(burned=Sum('calories_burned'))
+    def get(self, request):
+        # Per-day and per-week intake of every nutrient; see FitedSync.nutrients.nutrition_report
+        try:
+            end = datetime.strptime(request.query_params['end'], '%Y-%m-%d').date() if request.query_params.get('end') else datetime.now().date()
+            start = datetime.strptime(request.query_params['start'], '%Y-%m-%d').date() if request.query_params.get('start') else end - timedelta(days=6)
+        except ValueError:
+            return Response({'error': 'start and end must be YYYY-MM-DD dates.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_days = getattr(settings, 'NUTRITION_REPORT_MAX_DAYS', 366)
+        if end < start or (end - start).days >= max_days:
+            return Response({'error': f'The range must run forwards and cover at most {max_days} days.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Catalog edits change the per-gram values, so they are part of the key
+        version, _ = catalog_versions.get(FOODS)
+        data = dashboard_cache.get_or_compute(
+            'nutrition-report', request.user.pk, DashboardCache.date_range(start, end),
+            lambda: nutrition_report(request.user, start, end), params=f'{start}:{end}:{version}'
         )
+        return Response(data)
 
-        # Combine data by date
-        data = {}
-        for log in meal_logs:
-            date = log['date']
-            if date not in data:
-                data[date] = {'date': date, 'consumed': 0, 'burned': 0}
-            data[date]['consumed'] = log['consumed']
-
-        for log in exercise_logs:
-            date = log['date']
-            if date not in data:
-                data[date] = {'date': date, 'consumed': 0, 'burned': 0}
-            data[date]['burned'] = log['burned']
-
-        for log in workout_logs:
-            date = log['date']
-            if date not in data:
-                data[date] = {'date': date, 'consumed': 0, 'burned': 0}
-            data[date]['burned'] = log['burned']
-
-        # Convert to list for serialization
-        response_data = list(data.values())
-        return Response(response_data)
+class MealPlanView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # A day of meals hitting the user's calorie and macro targets; see FitedSync.mealplan
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(meal_planner.plan(request.user, request.data))
+        except MealPlanError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class CalorieDataViewSet(viewsets.ModelViewSet):
+    permission_classes = [IsAuthenticated]
+    serializer_class = CalorieDataSerializer
+
+    def list(self, request, *args, **kwargs):
+        user_id = request.user.id
+        try:
+            # Other users' history is for staff only
+            if request.user.is_staff and self.request.query_params.get('userId'):
+                user_id = int(self.request.query_params['userId'])
+            start_date, end_date = (
+                datetime.strptime(value, '%Y-%m-%d').date() if value else None
+                for value in (self.request.query_params.get('start_date'), self.request.query_params.get('end_date'))
+            )
+        except ValueError:
+            return Response({'error': 'userId must be a number and start_date and end_date YYYY-MM-DD dates.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One indexed range read over the materialized daily rollups
+        rollups = DailyCalorieRollup.objects.filter(user_id=user_id).order_by('date')
+        if start_date:
+            rollups = rollups.filter(date__gte=start_date)
+        if end_date:
+            rollups = rollups.filter(date__lte=end_date)
+
+        serializer = self.get_serializer(rollups, many=True)
+        return Response(serializer.data)
     
 class UserViewSet(viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
@@ -100,8 +228,10 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get', 'put'])
     def profile(self, request):
         if request.method == 'GET':
-            serializer = self.get_serializer(request.user)
-            return Response(serializer.data)
+            data = dashboard_cache.get_or_compute(
+                'profile', request.user.pk, [], lambda: self.get_serializer(request.user).data
+            )
+            return Response(data)
         elif request.method == 'PUT':
             serializer = self.get_serializer(request.user, data=request.data, partial=True)
             if serializer.is_valid():
@@ -113,19 +243,24 @@ class UserViewSet(viewsets.ModelViewSet):
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+class ExerciseViewSet(CatalogFragmentMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    fragments = exercise_fragments
+    catalog = EXERCISES
 
     @action(detail=False, methods=['get'])
     def search(self, request):
         query = request.query_params.get('q', '')
-        exercises = Exercise.objects.filter(title__icontains=query)
-        serializer = self.get_serializer(exercises, many=True)
-        return Response(serializer.data)
+        filters = {facet: get_list_param(request, facet) for facet in exercise_index.FACETS}
+        limit = get_int_param(request, 'limit', exercise_index.default_limit)
+        offset = get_int_param(request, 'offset', 0)
+
+        # BM25 ranked hits plus muscle group / equipment facet counts
+        return Response(exercise_index.search(query, filters=filters, limit=limit, offset=offset))
         
-class CustWorkoutViewSet(viewsets.ModelViewSet):
+class CustWorkoutViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = CustWorkout.objects.all()
     serializer_class = CustWorkoutSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -159,42 +294,69 @@ class CustWorkoutViewSet(viewsets.ModelViewSet):
     def log_workout(self, request, pk=None):
         custom_workout = self.get_object()
         user = request.user
-        weight = request.data.get('weight')
+        # Falls back to the weight on the user's profile
+        weight = request.data.get('weight') or user.weight
         
         if not weight:
             return Response({"error": "Weight is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             weight = float(weight)
-        except ValueError:
+        except (TypeError, ValueError):
             return Response({"error": "Invalid weight value"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate calories burned (you may want to adjust this calculation)
+        # MET of the workout's exercises, see FitedSync.calories
+        prefetch_related_objects([custom_workout], 'workout_exercises__exercise')
         calories_burned = custom_workout.calculate_calories(weight)
 
-        log = ExerciseLog.objects.create(
+        log = CustWorkoutLog.objects.create(
             user=user,
-            custom_workout=custom_workout,
+            routine_name=custom_workout.name,
             duration_minutes=custom_workout.duration,
             calories_burned=calories_burned,
             date=datetime.now().date()
         )
 
-        serializer = ExerciseLogSerializer(log)
+        serializer = CustWorkoutLogSerializer(log)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class WorkoutRoutineViewSet(viewsets.ModelViewSet):
+class WorkoutRoutineViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = WorkoutRoutine.objects.all()
     serializer_class = WorkoutRoutineSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def list(self, request, *args, **kwargs):
+        # calories_burned depends on the user's weight, so it is part of the ETag
+        return conditional_catalog_response(
+            request, ROUTINES, lambda: self.list_response(request, *args, **kwargs), request.user.weight
+        )
+
+    def retrieve(self, request, pk=None, *args, **kwargs):
+        return conditional_catalog_response(
+            request, ROUTINES, lambda: self.retrieve_response(request, pk, *args, **kwargs), request.user.weight
+        )
+
+    def list_response(self, request, *args, **kwargs):
         logger.debug(f"Accessing workout-routines list view with request: {request.method}")
         try:
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
+            if isinstance(request.accepted_renderer, FastJSONRenderer) and not wants_sparse(request):
+                # Cached row JSON with calories_burned added for this user
+                return Response(routine_fragments.render_list(
+                    WorkoutRoutine.objects.all(), request.user.weight, request.data.get('duration')
+                ))
+
+            routines = list(self.get_queryset())
+
+            # Calories for every routine in one pass over the prefetched exercises
+            context = self.get_serializer_context()
+            context['calories_burned'] = WorkoutRoutine.calculate_calories_bulk(
+                routines, request.user.weight, request.data.get('duration')
+            )
+            serializer = self.get_serializer(routines, many=True, context=context)
+            return self.sparse_response(serializer.data, serializer.child)
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error in workout-routines list view: {str(e)}")
             return Response(
@@ -202,17 +364,30 @@ class WorkoutRoutineViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def retrieve(self, request, pk=None, *args, **kwargs):
+    def retrieve_response(self, request, pk=None, *args, **kwargs):
         logger.debug(f"Accessing workout-routine detail view for pk: {pk}")
         try:
+            if isinstance(request.accepted_renderer, FastJSONRenderer) and not wants_sparse(request):
+                try:
+                    data = routine_fragments.render_one(
+                        WorkoutRoutine.objects.all(), pk, request.user.weight, request.data.get('duration')
+                    )
+                except (TypeError, ValueError):
+                    data = None
+                if data is None:
+                    raise ObjectDoesNotExist
+                return Response(data)
+
             instance = self.get_object()
             serializer = self.get_serializer(instance)
             return Response(serializer.data)
-        except ObjectDoesNotExist:
+        except (ObjectDoesNotExist, Http404):
             return Response(
                 {"detail": "Workout routine not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error in workout-routine detail view: {str(e)}")
             return Response(
@@ -222,7 +397,11 @@ class WorkoutRoutineViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         logger.debug("Getting workout-routines queryset")
-        return WorkoutRoutine.objects.all()
+        # Fixed number of queries regardless of how many routines are listed
+        return WorkoutRoutine.objects.prefetch_related(
+            Prefetch('workoutexercise_set', queryset=WorkoutExercise.objects.select_related('exercise')),
+            'exercise',
+        )
 
     @action(detail=True, methods=['post'])
     def log_workout(self, request, pk=None):
@@ -231,15 +410,15 @@ class WorkoutRoutineViewSet(viewsets.ModelViewSet):
             user = request.user
             duration = request.data.get('duration', workout.duration)
             
-            log = ExerciseLog.objects.create(
+            log = WorkoutLog.objects.create(
                 user=user,
-                workout_routine=workout,
+                routine_name=workout.name,
                 duration_minutes=duration,
                 calories_burned=workout.calculate_calories(user.weight, duration),
                 date=datetime.now().date()
             )
             
-            serializer = ExerciseLogSerializer(log)
+            serializer = WorkoutLogSerializer(log)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
             logger.error(f"Error logging workout: {str(e)}")
@@ -248,42 +427,168 @@ class WorkoutRoutineViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class FoodViewSet(viewsets.ModelViewSet):
+class FoodViewSet(CatalogFragmentMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = FoodItem.objects.all()
     serializer_class = FoodItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    fragments = food_fragments
+    catalog = FOODS
+
+    def list_response(self, request, *args, **kwargs):
+        if not has_food_query(request):
+            return super().list_response(request, *args, **kwargs)
+
+        # Range filters and sorting run on the in-memory food table; see FitedSync.foodquery
+        paginator = FoodQueryPagination()
+        page = paginator.paginate_queryset(query_food_ids(request.query_params), request, view=self)
+        queryset = in_order(self.get_queryset(), page)
+        if self.uses_fragments(request):
+            envelope = encode_json({
+                'count': paginator.count, 'next': paginator.get_next_link(), 'previous': paginator.get_previous_link(),
+            })
+            return Response(RawJSON(envelope[:-1] + b',"results":' + self.fragments.render_list(queryset) + b'}'))
+
+        serializer = self.get_serializer(self.filter_queryset(queryset), many=True)
+        data = serializer.data
+        if is_compact(request):
+            data = to_columns(list(serializer.child.fields), data)
+        return paginator.get_paginated_response(data)
 
     @action(detail=False, methods=['get'])
     def search(self, request):
         query = request.query_params.get('q', '')
-        foods = FoodItem.objects.filter(food_name__icontains=query)
-        serializer = self.get_serializer(foods, many=True)
-        return Response(serializer.data)
+        limit = get_int_param(request, 'limit', food_index.default_limit)
+
+        # Served from the in-memory index, ranked and capped at limit
+        return Response(food_index.search(query, limit=limit))
+
+    @action(detail=False, methods=['get'])
+    def resolve(self, request):
+        # Best catalog match and confidence for each ?name=, null when nothing is close
+        names = request.query_params.getlist('name')[:food_index.max_limit]
+        if not names:
+            return Response({"error": "name is a required query parameter."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response([
+            {'name': name, 'match': match} for name, match in zip(names, food_resolver.resolve_many(names))
+        ])
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        # Closest foods by nutrient profile; ?less=sugars&more=protein&same=calories narrow them down
+        constraints = {}
+        for param in ('less', 'more', 'same'):
+            names = [MEAL_LOG_FIELDS.get(name.strip(), name.strip()) for name in request.query_params.get(param, '').split(',') if name.strip()]
+            unknown = [name for name in names if name not in COLUMN]
+            if unknown:
+                return Response({"error": f"Unknown nutrient(s) for {param}: {', '.join(unknown)}."}, status=status.HTTP_400_BAD_REQUEST)
+            constraints[param] = names
+
+        def nearest():
+            matches = similar_foods.similar(
+                int(pk), get_int_param(request, 'limit', similar_foods.default_limit), tolerance=tolerance, **constraints
+            )
+            # The picker columns, read from the database so they match the current catalog
+            rows = FoodItem.objects.filter(pk__in=[food_id for food_id, _ in matches]).values(*food_index.FIELDS)
+            return matches, {row['id']: row for row in rows}
+
+        try:
+            tolerance = float(request.query_params.get('tolerance', 0.1))
+            matches, rows = nearest()
+            if len(rows) < len(matches):
+                # Foods deleted since the matrix was loaded; reload it from the current catalog and search again
+                nutrient_matrix.invalidate()
+                matches, rows = nearest()
+        except (TypeError, ValueError, UnknownFood):
+            raise Http404
+        if len(rows) < len(matches):
+            logger.warning("Similar foods of %s left out deleted foods %s", pk, [food_id for food_id, _ in matches if food_id not in rows])
+        return Response([
+            {**rows[food_id], 'distance': round(distance, 4)} for food_id, distance in matches if food_id in rows
+        ])
+
+    def snapshot_entry(self, entry):
+        return {
+            'version': entry['version'],
+            'hash': entry['hash'],
+            'rows': entry['rows'],
+            'url': self.reverse_action('snapshot-file', args=[entry['file']]),
+            'size': entry['size'],
+        }
 
-class UserDailyLogViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        # The latest offline catalog; with ?since=<hash>, the diffs leading to it
+        latest = snapshot_store.latest()
+        if latest is None:
+            return Response({"error": "No snapshot has been published."}, status=status.HTTP_404_NOT_FOUND)
+
+        data = self.snapshot_entry(latest)
+        since = request.query_params.get('since')
+        if since:
+            newer = snapshot_store.chain(since)
+            # None: unknown or expired version, download the full snapshot
+            data['diffs'] = None if newer is None else [
+                {
+                    'version': entry['version'],
+                    'url': self.reverse_action('snapshot-file', args=[entry['diff']]),
+                    'size': entry['diff_size'],
+                }
+                for entry in newer
+            ]
+        response = Response(data)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=False, methods=['get'], url_name='snapshot-file',
+            url_path=r'snapshot/(?P<name>foods-[0-9a-f-]+\.(?:sqlite|json)\.gz)')
+    def snapshot_file(self, request, name=None):
+        if name not in snapshot_store.files():
+            raise Http404
+        # Files are named by content hash, so they never change
+        etag = quote_etag(name)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(open(snapshot_store.path(name), 'rb'), content_type='application/gzip')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
+class UserDailyLogViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = UserDailyLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DateKeysetPagination
 
     def get_queryset(self):
         return UserDailyLog.objects.filter(user=self.request.user)
 
     @action(detail=False, methods=['get'])
     def today(self, request):
-        log = UserDailyLog.objects.filter(
-            user=request.user,
-            date=datetime.now().date()
-        ).first()
-        if not log:
-            log = UserDailyLog.objects.create(
+        today = datetime.now().date()
+
+        def get_today_log():
+            log = UserDailyLog.objects.filter(
                 user=request.user,
-                date=datetime.now().date()
-            )
-        serializer = self.get_serializer(log)
-        return Response(serializer.data)
+                date=today
+            ).first()
+            if not log:
+                log = UserDailyLog.objects.create(
+                    user=request.user,
+                    date=today
+                )
+            serializer = self.get_serializer(log)
+            return serializer.data
+
+        return Response(dashboard_cache.get_or_compute('daily-log-today', request.user.pk, [today], get_today_log))
 
-class MealViewSet(viewsets.ModelViewSet):
+class MealViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Meal.objects.all()
     serializer_class = MealSerializer
+    pagination_class = DateKeysetPagination
+
+    def get_queryset(self):
+        return Meal.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('meal_logs', queryset=MealLog.objects.select_related('food_item'))
+        )
 
     @action(detail=False, methods=['get'])
     def get_daily_meal_summary(self, request):
@@ -299,9 +604,9 @@ class MealViewSet(viewsets.ModelViewSet):
             return Response({"error": "date is a required query parameter."}, 
                             status=status.HTTP_400_BAD_REQUEST)
 
-        try:
+        def summarize():
             meal_logs = MealLog.objects.filter(user=user, date=date).select_related('food_item')
-            data = [
+            return [
                 {
                     'id': log.id,
                     'meal_type': log.meal_type,
@@ -321,6 +626,11 @@ class MealViewSet(viewsets.ModelViewSet):
                 }
                 for log in meal_logs
             ]
+
+        try:
+            data = dashboard_cache.get_or_compute(
+                'meal-summary', user.pk, dashboard_cache.date_range(date, date), summarize
+            )
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -340,70 +650,21 @@ class MealViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Create or retrieve the meal entry
-            meal, created = Meal.objects.get_or_create(
-                user=user,
-                date=date,
-                meal_type=meal_type
-            )
+            meal, totals = ingest_meal(user, date, meal_type, food_items_data)
 
-            # Clear any existing logs for the meal (to avoid duplicates)
-            meal.meal_logs.clear()
-
-            # Create meal logs for each food item and associate them with the meal
-            for food_data in food_items_data:
-                food_item_id = food_data.get('food_item')
-                quantity = food_data.get('quantity')
-                food_name = food_data.get('food_name')
-
-                if not food_item_id or not quantity:
-                    return Response({"error": "Each food item must include food_item and quantity."},
-                                    status=status.HTTP_400_BAD_REQUEST)
-
-                # Get the FoodItem instance
-                food_item = FoodItem.objects.get(id=food_item_id)
-
-                # Calculate nutritional values
-                calories = food_item.caloric_value * quantity
-                protein = food_item.protein * quantity
-                carbohydrates = food_item.carbohydrates * quantity
-                fat = food_item.fat * quantity
-
-                # Create a new MealLog instance
-                meal_log = MealLog.objects.create(
-                    user=user,
-                    date=date,
-                    meal_type=meal_type,
-                    food_item=food_item,
-                    quantity=quantity,
-                    calories=calories,
-                    protein=protein,
-                    carbohydrates=carbohydrates,
-                    food_name=food_name,
-                    fat=fat
-                )
-
-                # Associate the MealLog with the Meal
-                meal.meal_logs.add(meal_log)
-
-            # Calculate the total nutrition from the meal logs associated with this meal
-            meal_logs = meal.meal_logs.all()
-            meal.total_calories = meal_logs.aggregate(Sum('calories'))['calories__sum'] or 0
-            meal.total_protein = meal_logs.aggregate(Sum('protein'))['protein__sum'] or 0
-            meal.total_carbs = meal_logs.aggregate(Sum('carbohydrates'))['carbohydrates__sum'] or 0
-            meal.total_fat = meal_logs.aggregate(Sum('fat'))['fat__sum'] or 0
-            meal.save()
-
-            # Serialize the updated meal instance
+            # Serialize the updated meal instance with its logs in one query
+            prefetch_related_objects(
+                [meal], Prefetch('meal_logs', queryset=MealLog.objects.select_related('food_item'))
+            )
             serializer = MealSerializer(meal)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response({**serializer.data, 'totals': totals}, status=status.HTTP_201_CREATED)
 
-        except FoodItem.DoesNotExist:
-            return Response({"error": "Invalid food item."}, status=status.HTTP_400_BAD_REQUEST)
+        except MealIngestError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ExerciseLogViewSet(viewsets.ModelViewSet):
+class ExerciseLogViewSet(LogHistoryMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = ExerciseLogSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -427,16 +688,21 @@ class ExerciseLogViewSet(viewsets.ModelViewSet):
         if not end_date:
             end_date = datetime.now().strftime('%Y-%m-%d')
 
-        # Filter queryset by date range
-        queryset = queryset.filter(date__range=[start_date, end_date])
+        def summarize():
+            # Filter queryset by date range
+            filtered = queryset.filter(date__range=[start_date, end_date])
 
-        # Group by exercise and aggregate data
-        exercise_summary = queryset.values('exercise__title').annotate(
-            total_duration=Sum('duration_minutes'),
-            total_calories=Sum('calories_burned')
-        )
+            # Group by exercise and aggregate data
+            exercise_summary = filtered.values('exercise__title').annotate(
+                total_duration=Sum('duration_minutes'),
+                total_calories=Sum('calories_burned')
+            )
+            return list(exercise_summary)
 
-        return Response(exercise_summary)
+        return Response(dashboard_cache.get_or_compute(
+            'exercise-logs', request.user.pk, dashboard_cache.date_range(start_date, end_date),
+            summarize, params=f'{start_date}:{end_date}'
+        ))
 
     def perform_create(self, serializer):
         try:
@@ -444,7 +710,7 @@ class ExerciseLogViewSet(viewsets.ModelViewSet):
         except Exception as e:
             raise ValidationError({"detail": f"Error creating exercise log: {str(e)}"})
 
-class WorkoutLogViewSet(viewsets.ModelViewSet):
+class WorkoutLogViewSet(LogHistoryMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = WorkoutLogSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -468,16 +734,21 @@ class WorkoutLogViewSet(viewsets.ModelViewSet):
         if not end_date:
             end_date = datetime.now().strftime('%Y-%m-%d')
 
-        # Filter queryset by date range
-        queryset = queryset.filter(date__range=[start_date, end_date])
+        def summarize():
+            # Filter queryset by date range
+            filtered = queryset.filter(date__range=[start_date, end_date])
 
-        # Group by exercise and aggregate data
-        workout_summary = queryset.values('routine_name').annotate(
-            total_duration=Sum('duration_minutes'),
-            total_calories=Sum('calories_burned')
-        )
+            # Group by exercise and aggregate data
+            workout_summary = filtered.values('routine_name').annotate(
+                total_duration=Sum('duration_minutes'),
+                total_calories=Sum('calories_burned')
+            )
+            return list(workout_summary)
 
-        return Response(workout_summary)
+        return Response(dashboard_cache.get_or_compute(
+            'workout-logs', request.user.pk, dashboard_cache.date_range(start_date, end_date),
+            summarize, params=f'{start_date}:{end_date}'
+        ))
 
     def perform_create(self, serializer):
         try:
@@ -485,7 +756,7 @@ class WorkoutLogViewSet(viewsets.ModelViewSet):
         except Exception as e:
             raise ValidationError({"detail": f"Error creating workout log: {str(e)}"})
         
-class CustWorkoutLogViewSet(viewsets.ModelViewSet):
+class CustWorkoutLogViewSet(LogHistoryMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = CustWorkoutLogSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -509,16 +780,21 @@ class CustWorkoutLogViewSet(viewsets.ModelViewSet):
         if not end_date:
             end_date = datetime.now().strftime('%Y-%m-%d')
 
-        # Filter queryset by date range
-        queryset = queryset.filter(date__range=[start_date, end_date])
+        def summarize():
+            # Filter queryset by date range
+            filtered = queryset.filter(date__range=[start_date, end_date])
 
-        # Group by exercise and aggregate data
-        cust_workout_summary = queryset.values('routine_name').annotate(
-            total_duration=Sum('duration_minutes'),
-            total_calories=Sum('calories_burned')
-        )
+            # Group by exercise and aggregate data
+            cust_workout_summary = filtered.values('routine_name').annotate(
+                total_duration=Sum('duration_minutes'),
+                total_calories=Sum('calories_burned')
+            )
+            return list(cust_workout_summary)
 
-        return Response(cust_workout_summary)
+        return Response(dashboard_cache.get_or_compute(
+            'cust-workout-logs', request.user.pk, dashboard_cache.date_range(start_date, end_date),
+            summarize, params=f'{start_date}:{end_date}'
+        ))
 
     def perform_create(self, serializer):
         try: